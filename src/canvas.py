@@ -2,6 +2,7 @@ import logging
 
 logger = logging.getLogger('curve-editor')
 
+import numpy as np
 from PyQt5 import QtGui, QtWidgets
 from PyQt5.QtCore import Qt
 
@@ -11,34 +12,101 @@ from .model import CurvesModel
 class Canvas(QtWidgets.QGraphicsPixmapItem):
     """ Canvas for drawing"""
 
+    zoom_range = (1 / 64, 64.0)
+    zoom_step = 1.25
+
     def __init__(self):
         super().__init__(QtGui.QPixmap(930, 690))
         self.model: CurvesModel = None
 
+        # scene point shown at the top left corner of the view, and view pixels per scene unit
+        self.pan = np.zeros(2)
+        self.zoom = 1.0
+        self.pan_start = None
+
+        self.backing = QtGui.QPixmap(930, 690)
+
     def setModel(self, model):
         self.model: CurvesModel = model
         self.model.layoutChanged.connect(self.draw)
 
+    def scene_position(self, event):
+        """ Scene coordinates of a mouse event on the canvas """
+        x, y = self.pan + np.array([event.pos().x(), event.pos().y()]) / self.zoom
+        return x, y
+
+    def scene_distance(self, pixels):
+        """ Scene length covering the given number of view pixels, so picking tolerances stay constant on screen """
+        return pixels / self.zoom
+
+    def viewport_size(self):
+        views = self.scene().views() if self.scene() is not None else []
+        if not views:
+            return self.backing.width(), self.backing.height(), 1.0
+
+        viewport = views[0].viewport()
+        return viewport.width(), viewport.height(), viewport.devicePixelRatioF()
+
     def mousePressEvent(self, event) -> None:
+        if event.button() == Qt.MiddleButton:
+            self.pan_start = (event.pos().x(), event.pos().y())
+            return
+
         self.model.state.mousePressEvent(event, self)
 
     def mouseMoveEvent(self, event) -> None:
+        if self.pan_start is not None:
+            x, y = event.pos().x(), event.pos().y()
+            self.pan = self.pan - np.subtract((x, y), self.pan_start) / self.zoom
+            self.pan_start = (x, y)
+            self.model.updated()
+            return
+
         self.model.state.mouseMoveEvent(event, self)
 
     def mouseReleaseEvent(self, event) -> None:
+        if self.pan_start is not None:
+            self.pan_start = None
+            return
+
         self.model.state.mouseReleaseEvent(event, self)
 
-    def draw(self):
-        # pixmap = QtGui.QPixmap(930, 690)
-        pixmap = QtGui.QPixmap(2000, 1000)
+    def wheelEvent(self, event) -> None:
+        # zoom about the cursor, keeping the scene point under it in place
+        anchor = np.array(self.scene_position(event))
+        factor = self.zoom_step if event.delta() > 0 else 1 / self.zoom_step
+        self.zoom = float(np.clip(self.zoom * factor, *self.zoom_range))
+        self.pan = anchor - np.array([event.pos().x(), event.pos().y()]) / self.zoom
+
+        event.accept()
+        self.model.updated()
 
+    def draw(self):
+        width, height, ratio = self.viewport_size()
+
+        # the backing store follows the view size and is only reallocated when that changes
+        pixmap = self.backing
+        if (pixmap.width(), pixmap.height()) != (int(width * ratio), int(height * ratio)):
+            pixmap = self.backing = QtGui.QPixmap(int(width * ratio), int(height * ratio))
+            if self.scene() is not None:
+                self.scene().setSceneRect(0, 0, width, height)
+        pixmap.setDevicePixelRatio(ratio)
+
+        # the item shares the last frame; drop its reference so painting does not detach a copy
+        self.setPixmap(QtGui.QPixmap())
         pixmap.fill(Qt.white)
 
         qp = QtGui.QPainter(pixmap)
         qp.setRenderHint(QtGui.QPainter.Antialiasing, True)
+        qp.scale(self.zoom, self.zoom)
+        qp.translate(-self.pan[0], -self.pan[1])
 
+        # curves whose boxes miss the view are skipped, the rest replay their cached layers
+        visible = (self.pan, self.pan + np.array([width, height], dtype=float) / self.zoom)
         for curve in self.model.curves:
-            curve.draw(qp)
+            if curve.hidden or not len(curve._nodes) or not curve.visible_in(*visible):
+                continue
+            qp.drawPicture(0, 0, curve.render_layer(self.zoom * ratio))
 
         qp.end()
         self.setPixmap(pixmap)
@@ -2,8 +2,11 @@ from .bezier import BezierCurve
 from .cubic_spline import CubicSpline
 from .curves import Curve
 from .interpolation_polynomial import InterpolationPolynomialCurve
+from .nurbs import NURBSCurve
+from .periodic_cubic_spline import PeriodicCubicSpline
 from .polygonal import PolygonalCurve
 from .rational_bezier import RationalBezierCurve
+from .weighted_curve import WeightedCurve
 
-__all__ = ["BezierCurve", "CubicSpline", "Curve", "InterpolationPolynomialCurve", "PolygonalCurve",
-           "RationalBezierCurve"]
+__all__ = ["BezierCurve", "CubicSpline", "Curve", "InterpolationPolynomialCurve", "NURBSCurve",
+           "PeriodicCubicSpline", "PolygonalCurve", "RationalBezierCurve", "WeightedCurve"]
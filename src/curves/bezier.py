@@ -1,4 +1,5 @@
 import logging
+from functools import lru_cache
 
 logger = logging.getLogger('curve-editor')
 
@@ -8,7 +9,7 @@ from scipy.special import comb
 from PyQt5 import QtGui, QtCore, QtWidgets
 from PyQt5.QtWidgets import QInputDialog
 
-from .curves import Curve
+from .curves import Curve, POLYGON_PEN
 
 from src.states import SplitCurveState, DefaultState
 
@@ -31,18 +32,18 @@ class JoinRightSmoothState(DefaultState):
         self.controller.setChecked(False)
 
     def mousePressEvent(self, event, canvas):
-        x, y = event.pos().x(), event.pos().y()
+        x, y = canvas.scene_position(event)
         curve = self.curve
 
-        index, dist = canvas.model.distance_to_nearest_curve(x, y)
+        index, dist = canvas.model.distance_to_nearest_curve(x, y, max_dist=canvas.scene_distance(10))
 
         logger.info("Joining")
 
-        if dist is not None and dist < 10:
+        if dist is not None and dist < canvas.scene_distance(10):
             other = canvas.model.curves[index]
             if type(curve) is type(other):
-                curve.join_right_smooth(other, c1=(self.method == "C1"))
-                canvas.model.updated()
+                c1 = self.method == "C1"
+                canvas.model.defer((other, "join"), lambda: curve.join_right_smooth(other, c1=c1))
 
         canvas.model.state = self.next_state()
 
@@ -50,10 +51,8 @@ class JoinRightSmoothState(DefaultState):
 class BezierCurve(Curve):
     type = "Bezier Curve"
 
-    def __init__(self, name, nodes=None):
-        super().__init__(name, nodes)
-
-        self.helper_nodes = {}
+    # largest Bernstein matrix kept in the cache, which is bounded by entry count only
+    basis_cache_bytes = 1 << 20
 
     def add_node(self, x, y, calculate=True):
         self.nodes.append((x, y))
@@ -83,6 +82,10 @@ class BezierCurve(Curve):
         self.drop_degree_first_action.triggered.connect(self.drop_degree_first_action_triggered)
         drop_degree_menu.addAction(self.drop_degree_first_action)
 
+        self.drop_degree_least_squares_action = QtWidgets.QAction("Least squares", parent)
+        self.drop_degree_least_squares_action.triggered.connect(self.drop_degree_least_squares_action_triggered)
+        drop_degree_menu.addAction(self.drop_degree_least_squares_action)
+
         self.drop_degree_button.setMenu(drop_degree_menu)
         self.extra_toolbar.addWidget(self.drop_degree_button)
 
@@ -111,24 +114,21 @@ class BezierCurve(Curve):
             self.model.state = DefaultState()
 
     def split_curve(self, index):
-        n = len(self.nodes) - 1
-
-        first_nodes = [tuple(self._de_casteljau(k, 0, index))
-                       for k in range(n + 1)]
-
-        second_nodes = [tuple(self._de_casteljau(k, n - k, index))
-                        for k in range(n + 1)]
+        return self.split_at(self.params[index])
 
-        first_curve = self.clone()
-        second_curve = self.clone()
-
-        first_curve.nodes = first_nodes
-        first_curve.calculate_points(force=True)
+    def split_at(self, t):
+        first_curve, second_curve = self.subdivide([t])
+        return first_curve, second_curve
 
-        second_curve.nodes = second_nodes
-        second_curve.calculate_points(force=True)
+    def subdivide(self, ts):
+        pieces = BezierCurve.subdivide_de_casteljau(self.nodes, ts)
+        return [self.with_nodes(piece) for piece in pieces]
 
-        return first_curve, second_curve
+    def with_nodes(self, nodes):
+        curve = self.clone()
+        curve.nodes = list(map(tuple, nodes))
+        curve.calculate_points(force=True)
+        return curve
 
     def dist(point_1: QtCore.QPointF, point_2: QtCore.QPointF) -> float:
         return np.sqrt(
@@ -191,18 +191,100 @@ class BezierCurve(Curve):
             self.drop_degree_first_method(degree)
             self.model.updated()
 
-    def raise_degree(self, m):
-        nodes = [np.array(node) for node in self.nodes]
-        n = len(nodes) - 1
+    @staticmethod
+    def bernstein_gram_matrix(m, n):
+        # integrals over [0, 1] of products of degree m and degree n Bernstein polynomials
+        i = np.arange(m + 1)[:, np.newaxis]
+        j = np.arange(n + 1)
+        return comb(m, i) * comb(n, j) / ((m + n + 1) * comb(m + n, i + j))
+
+    @staticmethod
+    @lru_cache(maxsize=32)
+    def reduction_matrix(degree, m, continuity=-1):
+        """ L2-optimal map from degree n nodes to degree m nodes, keeping C^continuity at both ends """
+        continuity = min(continuity, (m - 1) // 2)
+        fixed = np.zeros(m + 1, dtype=bool)
+        matrix = np.zeros((m + 1, degree + 1))
+
+        if continuity >= 0:
+            # elevating back must give the original first and last continuity + 1 nodes
+            elevation = BezierCurve.elevation_matrix(m, degree - m)
+            k = continuity + 1
+
+            matrix[:k, :k] = np.linalg.inv(elevation[:k, :k])
+            matrix[-k:, -k:] = np.linalg.inv(elevation[-k:, -k:])
+            fixed[:k] = fixed[-k:] = True
+
+        free = ~fixed
+        gram = BezierCurve.bernstein_gram_matrix(m, m)
+        mixed = BezierCurve.bernstein_gram_matrix(m, degree)
+
+        rhs = mixed[free] - gram[np.ix_(free, fixed)] @ matrix[fixed]
+        matrix[free] = np.linalg.solve(gram[np.ix_(free, free)], rhs)
+
+        matrix.setflags(write=False)
+        return matrix
+
+    def _reduce_degree(self, m, continuity):
+        n = len(self.nodes) - 1
+        new_nodes = BezierCurve.reduction_matrix(n, m, continuity) @ np.array(self.nodes, dtype=float)
+        self.nodes = list(map(tuple, new_nodes))
 
-        new_nodes = []
+    def reduce_degree(self, m, continuity=-1):
+        """ Reduce to degree m in one step and return the max distance between the old and the new curve """
+        if not 0 <= m < len(self.nodes) - 1:
+            return 0.0
 
-        for i in range(n + m + 1):
-            node = sum(nodes[k] * comb(n, k) * comb(m, i - k) * comb(n + m, i) ** (-1)
-                       for k in range(max(0, i - m), min(i, n) + 1))
-            new_nodes.append(tuple(node))
+        ts = np.linspace(0, 1, self.resolution + 1)
+        original = self.evaluate(ts)
 
-        self.nodes = new_nodes
+        self._reduce_degree(m, continuity)
+
+        difference = self.evaluate(ts) - original
+        self.calculate_points()
+        return float(np.max(np.hypot(difference[:, 0], difference[:, 1])))
+
+    def drop_degree_least_squares_action_triggered(self, state):
+        n = len(self.nodes) - 1
+        degree, ok = QInputDialog().getInt(self.model.parent,
+                                           "Drop degree (least squares)",
+                                           "Target degree:",
+                                           value=max(0, n - 1),
+                                           min=0,
+                                           max=max(0, n - 1),
+                                           step=1)
+        if not ok or degree >= n:
+            return
+
+        continuity, ok = QInputDialog().getInt(self.model.parent,
+                                               "Drop degree (least squares)",
+                                               "Endpoint continuity (-1 = none):",
+                                               value=-1,
+                                               min=-1,
+                                               max=max(-1, (degree - 1) // 2),
+                                               step=1)
+        if ok:
+            deviation = self.reduce_degree(degree, continuity)
+            logger.info(f"Degree dropping (least squares): {n} -> {degree}, C{continuity}, "
+                        f"max deviation {deviation:.3f}")
+            self.model.updated()
+
+    @staticmethod
+    @lru_cache(maxsize=32)
+    def elevation_matrix(degree, m):
+        # maps the n + 1 nodes of a degree n curve onto the n + m + 1 nodes of the same curve of degree n + m
+        rows = np.arange(degree + m + 1)[:, np.newaxis]
+        ks = np.arange(degree + 1)
+
+        matrix = comb(degree, ks) * comb(m, rows - ks) / comb(degree + m, rows)
+        matrix.setflags(write=False)
+        return matrix
+
+    def raise_degree(self, m):
+        if self.nodes:
+            n = len(self.nodes) - 1
+            new_nodes = BezierCurve.elevation_matrix(n, m) @ np.array(self.nodes, dtype=float)
+            self.nodes = list(map(tuple, new_nodes))
         self.calculate_points()
 
     def raise_degree_action_triggered(self, state):
@@ -230,6 +312,10 @@ class BezierCurve(Curve):
         else:
             self.model.state = DefaultState()
 
+    def arc_length_table_size(self):
+        # the control polygon is at least as long as the curve, so this keeps table chords near 1 px
+        return int(np.clip(self.__approximate_length(), 64, 16 * self.resolution))
+
     def __approximate_length(self):
         if len(self.nodes) < 2:
             return 0.0
@@ -243,84 +329,327 @@ class BezierCurve(Curve):
 
         return length
 
-    def _de_casteljau(self, k, i, t):
-        if (k, i, t) not in self.helper_nodes:
-            if k == 0:
-                self.helper_nodes[(k, i, t)] = np.array(self.nodes[i])
-            else:
-                u = t / self.resolution
-                self.helper_nodes[(k, i, t)] = (1 - u) * self._de_casteljau(k - 1, i, t) + \
-                                               u * self._de_casteljau(k - 1, i + 1, t)
-        return self.helper_nodes[(k, i, t)]
+    @staticmethod
+    def evaluate_de_casteljau(nodes, ts):
+        nodes = np.asarray(nodes, dtype=float)
+        ts = np.asarray(ts, dtype=float).reshape((-1,) + (1,) * nodes.ndim)
 
-    def de_casteljau(self, t):
-        return tuple(self._de_casteljau(len(self.nodes) - 1, 0, t))
+        # one row of the triangle for every parameter, reduced in place level by level
+        triangle = np.repeat(nodes[np.newaxis], len(ts), axis=0)
+        n = len(nodes) - 1
+        for k in range(1, n + 1):
+            head = triangle[:, :n + 1 - k]
+            head += ts * (triangle[:, 1:n + 2 - k] - head)
+
+        return triangle[:, 0]
+
+    @staticmethod
+    def split_de_casteljau(nodes, t):
+        # nodes may carry leading batch dimensions: (..., n + 1, dim)
+        triangle = np.array(nodes, dtype=float)
+        n = triangle.shape[-2] - 1
+
+        first_nodes = np.empty_like(triangle)
+        second_nodes = np.empty_like(triangle)
+        first_nodes[..., 0, :], second_nodes[..., n, :] = triangle[..., 0, :], triangle[..., n, :]
+
+        for k in range(1, n + 1):
+            head = triangle[..., :n + 1 - k, :]
+            head += t * (triangle[..., 1:n + 2 - k, :] - head)
+            first_nodes[..., k, :], second_nodes[..., n - k, :] = head[..., 0, :], head[..., -1, :]
+
+        return first_nodes, second_nodes
+
+    @staticmethod
+    def subdivide_de_casteljau(nodes, ts):
+        # cut at every parameter in a single left-to-right sweep, each cut reparametrized onto the remainder
+        ts = np.unique(np.clip(np.asarray(ts, dtype=float), 0, 1))
+
+        pieces = []
+        rest, start = np.asarray(nodes, dtype=float), 0.0
+        for t in ts:
+            piece, rest = BezierCurve.split_de_casteljau(rest, (t - start) / (1 - start))
+            pieces.append(piece)
+            start = t
+
+        pieces.append(rest)
+        return pieces
+
+    @staticmethod
+    @lru_cache(maxsize=32)
+    def power_basis(degree):
+        # power coefficients of the Bernstein polynomials: B_i(t) = sum_j comb(n, j) comb(j, i) (-1)^(j - i) t^j
+        js = np.arange(degree + 1)[:, np.newaxis]
+        ks = np.arange(degree + 1)
+
+        matrix = comb(degree, js) * comb(js, ks) * (-1.) ** (js - ks)
+        matrix.setflags(write=False)
+        return matrix
+
+    def compute_bounding_box(self):
+        n = len(self._nodes) - 1
+        if n < 1 or n > 16:
+            # high degree derivative roots are too ill-conditioned, the samples are used instead
+            return super().compute_bounding_box()
+
+        polynomial = np.polynomial.polynomial
+        coefficients = BezierCurve.power_basis(n) @ self.homogeneous_nodes()
+        ws = coefficients[:, 2]
+
+        # coordinate extrema are the roots of (x / w)' numerator, x' w - x w'
+        ts = [np.array([0.0, 1.0])]
+        for axis in range(2):
+            xs = coefficients[:, axis]
+            numerator = polynomial.polysub(polynomial.polymul(polynomial.polyder(xs), ws),
+                                           polynomial.polymul(xs, polynomial.polyder(ws)))
+            roots = polynomial.polyroots(polynomial.polytrim(numerator, tol=1e-12))
+            roots = roots[np.abs(roots.imag) < 1e-9].real
+            ts.append(roots[(roots > 0) & (roots < 1)])
+
+        points = self.evaluate(np.concatenate(ts))
+        return points.min(axis=0), points.max(axis=0)
+
+    def homogeneous_nodes(self):
+        nodes = self.node_array()
+        return np.column_stack((nodes, np.ones(len(nodes))))
+
+    @staticmethod
+    def from_homogeneous(homogeneous):
+        weights = homogeneous[..., -1]
+        nodes = homogeneous[..., :-1] / weights[..., np.newaxis]
+        return nodes, weights
+
+    @staticmethod
+    def caches_basis(degree, resolution):
+        return (resolution + 1) * (degree + 1) * 8 <= BezierCurve.basis_cache_bytes
+
+    @staticmethod
+    @lru_cache(maxsize=32)
+    def bernstein_basis(degree, resolution):
+        # shared by every curve of the same degree and resolution, so it must stay read-only
+        ts = np.linspace(0, 1, resolution + 1)[:, np.newaxis]
+        ks = np.arange(degree + 1)
+
+        basis = comb(degree, ks) * ts ** ks * (1 - ts) ** (degree - ks)
+        basis.setflags(write=False)
+        return basis
+
+    def de_casteljau(self, ts):
+        return BezierCurve.evaluate_de_casteljau(self.node_array(), ts)
+
+    @staticmethod
+    @lru_cache(maxsize=None)
+    def binomial_coefficients(degree):
+        coefficients = comb(degree, np.arange(degree + 1))
+        coefficients.setflags(write=False)
+        return coefficients
+
+    @staticmethod
+    def evaluate_horner(nodes, ts):
+        nodes = np.asarray(nodes, dtype=float)
+        ts = np.asarray(ts, dtype=float).reshape(-1, 1)
 
-    def horner(self, t):
-        n = len(self.nodes) - 1
-        nodes = np.array(self.nodes)
+        n = len(nodes) - 1
+        coefficients = nodes * BezierCurve.binomial_coefficients(n)[:, np.newaxis]
+        reversed_coefficients = coefficients[::-1]
 
-        if t <= 0.5:
-            u = t / (1 - t)
-            value = nodes[n]
-            for i in range(n - 1, -1, -1):
-                value = value * u + nodes[i] * comb(n, i)
-            value *= (1 - t) ** n
-            return tuple(value)
+        # for t > 0.5 run the scheme on reversed nodes with s = 1 - t, so that u never exceeds 1
+        low = ts <= 0.5
+        s = np.where(low, ts, 1 - ts)
+        u = s / (1 - s)
 
-        u = (1 - t) / t
-        value = nodes[0]
+        value = np.where(low, coefficients[n], reversed_coefficients[n])
         for i in range(n - 1, -1, -1):
-            value = value * u + nodes[n - i] * comb(n, n - i)
-        value *= t ** n
-        return tuple(value)
+            value = value * u + np.where(low, coefficients[i], reversed_coefficients[i])
+        value *= (1 - s) ** n
+        return value
+
+    def horner(self, ts):
+        return BezierCurve.evaluate_horner(self.node_array(), ts)
+
+    def evaluate(self, ts):
+        return self.de_casteljau(ts)
+
+    def node_basis(self, index):
+        if not isinstance(self.points, np.ndarray) or len(self.points) != len(self.params):
+            return None
+
+        n = len(self.nodes) - 1
+        ts = self.params
+        return comb(n, index) * ts ** index * (1 - ts) ** (n - index)
+
+    def intersect(self, other, tolerance=0.5, max_depth=40, max_pairs=4096):
+        """ Recursive subdivision of both control polygons, dropping pairs whose boxes are disjoint """
+        if not isinstance(other, BezierCurve) or not self.nodes or not other.nodes:
+            return super().intersect(other, tolerance)
+
+        polygons, other_polygons = self.homogeneous_nodes()[np.newaxis], other.homogeneous_nodes()[np.newaxis]
+        starts, other_starts, width = np.zeros(1), np.zeros(1), 1.0
+
+        found_ts, found_other_ts, found_widths = [], [], []
+        for depth in range(max_depth + 1):
+            projected, _ = BezierCurve.from_homogeneous(polygons)
+            other_projected, _ = BezierCurve.from_homogeneous(other_polygons)
+            lows, highs = projected.min(axis=1), projected.max(axis=1)
+            other_lows, other_highs = other_projected.min(axis=1), other_projected.max(axis=1)
+
+            overlap = np.all((lows <= other_highs) & (other_lows <= highs), axis=1)
+            size = np.maximum(np.max(highs - lows, axis=1), np.max(other_highs - other_lows, axis=1))
+            done = overlap & (size <= tolerance)
+            if depth == max_depth or overlap.sum() > max_pairs:
+                done = overlap
+
+            found_ts.append(starts[done] + width / 2)
+            found_other_ts.append(other_starts[done] + width / 2)
+            found_widths.append(np.full(done.sum(), width))
+
+            rest = overlap & ~done
+            if not rest.any():
+                break
+
+            # every surviving pair becomes the four pairs of its halves
+            first, second = BezierCurve.split_de_casteljau(polygons[rest], 0.5)
+            other_first, other_second = BezierCurve.split_de_casteljau(other_polygons[rest], 0.5)
+            width /= 2
+
+            polygons = np.concatenate((first, first, second, second))
+            other_polygons = np.concatenate((other_first, other_second, other_first, other_second))
+            starts = np.tile(starts[rest], 4) + np.repeat([0, 0, width, width], rest.sum())
+            other_starts = np.tile(other_starts[rest], 4) + np.repeat([0, width, 0, width], rest.sum())
+
+        ts, other_ts, widths = np.concatenate(found_ts), np.concatenate(found_other_ts), np.concatenate(found_widths)
+        if not len(ts):
+            return []
+
+        # a shallow crossing leaves a run of touching leaf cells, each run is refined to one root
+        roots = np.array([self.refine_intersection(other, ts[group], other_ts[group], widths[group])
+                          for group in BezierCurve.touching_groups(ts, other_ts, widths)])
+        ts, other_ts = roots[:, 0], roots[:, 1]
+        return Curve.merge_intersections(ts, other_ts, self.evaluate(ts), 2 * tolerance)
+
+    @staticmethod
+    def touching_groups(ts, other_ts, widths):
+        """ Indices of the leaf cells connected through touching (t, other t) squares, one array per group """
+        reach = (widths[:, np.newaxis] + widths[np.newaxis]) / 2 * (1 + 1e-9)
+        touching = (np.abs(ts[:, np.newaxis] - ts[np.newaxis]) <= reach) & \
+                   (np.abs(other_ts[:, np.newaxis] - other_ts[np.newaxis]) <= reach)
+
+        grouped = np.zeros(len(ts), dtype=bool)
+        groups = []
+        for seed in range(len(ts)):
+            if grouped[seed]:
+                continue
+
+            grouped[seed] = True
+            members, frontier = [seed], [seed]
+            while len(frontier):
+                frontier = np.flatnonzero(touching[frontier].any(axis=0) & ~grouped)
+                grouped[frontier] = True
+                members.extend(frontier)
+            groups.append(np.array(members))
+        return groups
+
+    def refine_intersection(self, other, ts, other_ts, widths, steps=8, h=1e-7):
+        """ Newton steps on self(t) = other(other t) from the best cell of a group, kept inside the group """
+        t_range = (max(0.0, (ts - widths / 2).min()), min(1.0, (ts + widths / 2).max()))
+        other_range = (max(0.0, (other_ts - widths / 2).min()), min(1.0, (other_ts + widths / 2).max()))
+
+        def gap(t, other_t):
+            return self.evaluate(np.array([t]))[0] - other.evaluate(np.array([other_t]))[0]
+
+        def derivative(curve, t):
+            t0, t1 = max(t - h, 0.0), min(t + h, 1.0)
+            points = curve.evaluate(np.array([t0, t1]))
+            return (points[1] - points[0]) / (t1 - t0)
+
+        gaps = np.hypot(*(self.evaluate(ts) - other.evaluate(other_ts)).T)
+        best = int(np.argmin(gaps))
+        t, other_t, best_gap = float(ts[best]), float(other_ts[best]), gaps[best]
+        root = (t, other_t)
+
+        for _ in range(steps):
+            jacobian = np.column_stack((derivative(self, t), -derivative(other, other_t)))
+            if abs(np.linalg.det(jacobian)) < 1e-12:
+                break
+
+            dt, dother_t = np.linalg.solve(jacobian, -gap(t, other_t))
+            t, other_t = float(np.clip(t + dt, *t_range)), float(np.clip(other_t + dother_t, *other_range))
+
+            distance = np.hypot(*gap(t, other_t))
+            if distance < best_gap:
+                root, best_gap = (t, other_t), distance
+            if distance < 1e-9:
+                break
+        return root
+
+    def flatten(self, tolerance=None, max_depth=20):
+        """ Subdivide control polygons until each one is flat within tolerance """
+        tolerance = self.tolerance if tolerance is None else tolerance
+
+        polygons = self.homogeneous_nodes()[np.newaxis]
+        starts, width = np.zeros(1), 1.0
+
+        flat_starts, flat_polygons = [], []
+        for depth in range(max_depth + 1):
+            projected, _ = BezierCurve.from_homogeneous(polygons)
+            deviation = Curve.chord_deviation(projected[:, :1], projected[:, -1:], projected[:, 1:-1])
+            flat = deviation.max(axis=1, initial=0.0) <= tolerance
+            if depth == max_depth:
+                flat[:] = True
+
+            flat_starts.append(starts[flat])
+            flat_polygons.append(projected[flat])
+
+            if flat.all():
+                break
+
+            first, second = BezierCurve.split_de_casteljau(polygons[~flat], 0.5)
+            width /= 2
+            polygons = np.concatenate((first, second))
+            starts = np.concatenate((starts[~flat], starts[~flat] + width))
+
+        starts = np.concatenate(flat_starts)
+        polygons = np.concatenate(flat_polygons)
+        order = np.argsort(starts)
+
+        ts = np.append(starts[order], 1.0)
+        points = np.concatenate((polygons[order, 0], polygons[order[-1:], -1]))
+        return ts, points
 
     def calculate_points(self, force=True, fast=False):
         super().calculate_points()
 
-        if not self.nodes:
+        if not len(self._nodes):
             self.points = []
             return self.points
 
-        if fast:
-            steps = max(20, self.resolution // 10)
-
-            # Horner algorithm
-            points = [self.horner(t) for t in np.linspace(0, 1, steps)]
-            self.points = points
+        if self.sampling != "uniform":
+            self.params, self.points = self.resample()
             return self.points
 
-        if force:
-            self.helper_nodes = {}
+        n = len(self._nodes) - 1
+        self.params = np.linspace(0, 1, self.resolution + 1)
 
-        steps = self.resolution
-
-        # De Casteljau Algorithm
-        points = [self.de_casteljau(i) for i in range(steps + 1)]
+        if BezierCurve.caches_basis(n, self.resolution):
+            points = BezierCurve.bernstein_basis(n, self.resolution) @ self.node_array()
+        else:
+            # the basis matrix would be too large to keep, Horner needs none
+            points = self.horner(self.params)
 
         self.points = points
         return self.points
 
     def draw_nodes(self, qp: QtGui.QPainter):
-        black_pen = QtGui.QPen(QtCore.Qt.black, 1, QtCore.Qt.DashLine)
-        red_pen = QtGui.QPen(self.node_color, 1, QtCore.Qt.DashLine)
-        red_brush = QtGui.QBrush(self.node_color)
-
+        pens = self.pens()
         node_size = self.node_size
-        old_point = self.nodes[0]
-
-        qp.setPen(red_pen)
-        qp.setBrush(red_brush)
-        qp.drawEllipse(QtCore.QPointF(old_point[0] - 3, old_point[1] - 3), node_size, node_size)
-
-        qp.drawText(old_point[0] + 5, old_point[1] - 3, '1')
-        for i, point in enumerate(self.nodes[1:]):
-            i += 2
-            qp.setPen(black_pen)
-            qp.drawLine(old_point[0], old_point[1], point[0], point[1])
 
-            qp.setPen(red_pen)
-            qp.drawEllipse(QtCore.QPointF(point[0] - 3, point[1] - 3), node_size, node_size)
+        # control polygon in one call, nodes on top of it
+        nodes = self.node_array()
+        qp.setPen(POLYGON_PEN)
+        qp.drawPolyline(self.polyline(nodes))
 
-            qp.drawText(point[0] + 5, point[1] - 3, '%d' % i)
-            old_point = point
+        qp.setPen(pens["node"])
+        qp.setBrush(pens["node_brush"])
+        for i, (x, y) in enumerate(nodes, 1):
+            qp.drawEllipse(QtCore.QPointF(x - 3, y - 3), node_size, node_size)
+            qp.drawText(QtCore.QPointF(x + 5, y - 3), '%d' % i)
@@ -1,6 +1,8 @@
 import logging
+from functools import lru_cache
 
 import numpy as np
+from scipy.linalg import cholesky_banded, cho_solve_banded
 
 from .curves import Curve
 
@@ -11,59 +13,67 @@ class CubicSpline(Curve):
     type = "Cubic Spline"
 
     @staticmethod
-    def cubic_interp1d(ts0, ts, xs):
-        ts = np.asfarray(ts)
-        xs = np.asfarray(xs)
-
-        n = len(ts)
-
-        dt = np.diff(ts)
-        dx = np.diff(xs)
-
-        # allocate buffer matrices
-        li = np.empty(n)
-        li_1 = np.empty(n - 1)
-        z = np.empty(n)
-
-        # fill diagonals Li and Li-1 and solve [L][xs] = [B]
-        li[0] = np.sqrt(2 * dt[0])
-        li_1[0] = 0.0
-        b0 = 0.0  # natural boundary
-        z[0] = b0 / li[0]
-
-        for i in range(1, n - 1, 1):
-            li_1[i] = dt[i - 1] / li[i - 1]
-            li[i] = np.sqrt(2 * (dt[i - 1] + dt[i]) - li_1[i - 1] * li_1[i - 1])
-            bi = 6 * (dx[i] / dt[i] - dx[i - 1] / dt[i - 1])
-            z[i] = (bi - li_1[i - 1] * z[i - 1]) / li[i]
-
-        i = n - 1
-        li_1[i - 1] = dt[-1] / li[i - 1]
-        li[i] = np.sqrt(2 * dt[-1] - li_1[i - 1] * li_1[i - 1])
-        bi = 0.0  # natural boundary
-        z[i] = (bi - li_1[i - 1] * z[i - 1]) / li[i]
-
-        # solve [L.T][ts] = [xs]
-        i = n - 1
-        z[i] = z[i] / li[i]
-        for i in range(n - 2, -1, -1):
-            z[i] = (z[i] - li_1[i - 1] * z[i + 1]) / li[i]
-
-        # find index
-        index = ts.searchsorted(ts0)
-        np.clip(index, 1, n - 1, index)
-
-        xi1, xi0 = ts[index], ts[index - 1]
-        yi1, yi0 = xs[index], xs[index - 1]
-        zi1, zi0 = z[index], z[index - 1]
-        hi1 = xi1 - xi0
-
-        # calculate cubic
-        f0 = zi0 / (6 * hi1) * (xi1 - ts0) ** 3 + \
-             zi1 / (6 * hi1) * (ts0 - xi0) ** 3 + \
-             (yi1 / hi1 - zi1 * hi1 / 6) * (ts0 - xi0) + \
-             (yi0 / hi1 - zi0 * hi1 / 6) * (xi1 - ts0)
-        return f0
+    @lru_cache(maxsize=32)
+    def factorization(n):
+        # natural spline on n uniform knots, interior equations scaled by 1 / h: z[i-1] + 4 z[i] + z[i+1] = b[i]
+        banded = np.empty((2, n - 2))
+        banded[0] = 1.0
+        banded[1] = 4.0
+
+        factor = cholesky_banded(banded)
+        factor.setflags(write=False)
+        return factor
+
+    @staticmethod
+    def second_derivatives(values):
+        n = len(values)
+        h = 1 / (n - 1)
+
+        z = np.zeros_like(values)
+        if n > 2:
+            rhs = 6 * (values[2:] - 2 * values[1:-1] + values[:-2]) / h ** 2
+            z[1:-1] = cho_solve_banded((CubicSpline.factorization(n), False), rhs)
+        return z
+
+    @staticmethod
+    def piecewise_cubic(ts0, values, z):
+        ts0 = np.asarray(ts0, dtype=float)
+
+        n = len(values)
+        h = 1 / (n - 1)
+
+        # uniform knots, so the interval is found arithmetically
+        index = np.clip((ts0 / h).astype(int), 0, n - 2)
+        left = (ts0 - index * h)[:, np.newaxis]
+        right = h - left
+
+        y0, y1 = values[index], values[index + 1]
+        z0, z1 = z[index], z[index + 1]
+
+        return z0 / (6 * h) * right ** 3 + \
+               z1 / (6 * h) * left ** 3 + \
+               (y1 / h - z1 * h / 6) * left + \
+               (y0 / h - z0 * h / 6) * right
+
+    @staticmethod
+    def interpolate(ts0, values):
+        """ Natural cubic spline through values at uniform knots on [0, 1], all columns at once """
+        values = np.asarray(values, dtype=float)
+        return CubicSpline.piecewise_cubic(ts0, values, CubicSpline.second_derivatives(values))
+
+    def evaluate(self, ts0):
+        nodes = self.node_array()
+        return self.interpolate(ts0, nodes)
+
+    def node_basis(self, index):
+        # below three nodes the samples are the nodes themselves
+        if len(self.nodes) < 3 or len(self.points) != len(self.params):
+            return None
+
+        # with fixed knots the spline is linear in the node values
+        unit = np.zeros(len(self.nodes))
+        unit[index] = 1.0
+        return self.interpolate(self.params, unit[:, np.newaxis])[:, 0]
 
     def calculate_points(self, force=True, fast=False):
         super().calculate_points()
@@ -73,23 +83,16 @@ class CubicSpline(Curve):
             return self.points
 
         if len(self.nodes) < 3:
+            self.params = np.linspace(0, 1, len(self.nodes))
             self.points = self.nodes
             return self.points
 
-        steps = self.resolution
-
-        xs, ys = zip(*self.nodes)
-        n = len(self.nodes)
-
-        ts = np.linspace(0, 1, n)
-        ts0 = np.linspace(0, 1, steps)
-
-        # xs_ = CS(ts, xs, bc_type='natural')(ts0)
-        # ys_ = CS(ts, ys, bc_type='natural')(ts0)
+        if self.sampling != "uniform":
+            self.params, self.points = self.resample()
+            return self.points
 
-        xs_ = CubicSpline.cubic_interp1d(ts0, ts, xs)
-        ys_ = CubicSpline.cubic_interp1d(ts0, ts, ys)
-        points = list(zip(xs_, ys_))
+        self.params = np.linspace(0, 1, self.resolution)
+        points = self.evaluate(self.params)
 
         self.points = points
         return self.points
@@ -7,14 +7,34 @@ import copy
 from PyQt5 import QtGui, QtWidgets, QtCore
 from PyQt5.QtWidgets import QInputDialog, QColorDialog
 
+from .node_index import NodeHull, NodeList
 from src.states import AddNodeState, DefaultState, RemoveNodeState, MoveNodeState, \
     ChangeNodesOrderState
 
+# style-independent pens, shared by every curve
+POLYGON_PEN = QtGui.QPen(QtCore.Qt.black, 1, QtCore.Qt.DashLine)
+HULL_PEN = QtGui.QPen(QtCore.Qt.green, 1, QtCore.Qt.DashLine)
+
 
 class Curve(object):
     type = "Base Curve"
 
+    # consecutive sample segments grouped under one bounding box in the hit-test index
+    segments_per_box = 32
+
     def __init__(self, name, nodes=None, model=None):
+        # buffers still shared with a clone, copied by own() before the first in-place edit
+        self.shared = frozenset()
+
+        self.revision = 0
+        self.segment_boxes = (None, None)
+        self.bounds = (None, None)
+        self.sampled_stamp = (None, None)
+        self.layer_cache = (None, None)
+        self.pen_cache = (None, None)
+        self.lod_cache = (None, {})
+        self.pending_transform = None
+
         self.nodes = nodes or []
         self.points = []
         self.convex_hull = []
@@ -35,6 +55,12 @@ class Curve(object):
 
         self.resolution = 500
 
+        self.sampling = "uniform"  # "adaptive", "arc-length"
+        self.tolerance = 0.5
+        self.params = np.empty(0)
+        self.arc_length_table = None
+        self.basis_columns = (self.params, {})
+
         self.highlight_color = QtGui.QColor(60, 202, 253, 20)
 
         self.model = model
@@ -45,6 +71,62 @@ class Curve(object):
     def __repr__(self):
         return f"{self.type} | {len(self.nodes)} nodes"
 
+    @property
+    def nodes(self):
+        if self.pending_transform is not None:
+            self.fold_transform()
+        if self.shared:
+            # callers edit the list in place, so it is copied on first access
+            self.own("_nodes")
+        return self._nodes
+
+    @nodes.setter
+    def nodes(self, nodes):
+        self.pending_transform = None
+        self.shared = self.shared - {"_nodes"}
+        self._nodes = nodes if isinstance(nodes, NodeList) else NodeList(nodes)
+
+    def node_array(self):
+        """ Nodes as an (n, 2) array with the pending transform applied, without folding it into the nodes """
+        nodes = np.array(self._nodes, dtype=float).reshape(-1, 2)
+        transform = self.pending_transform
+        if transform is not None and len(nodes):
+            nodes = nodes @ transform[:2, :2].T + transform[:2, 2]
+        return nodes
+
+    def fold_transform(self):
+        """ Apply the affine transform accumulated by transform() to the nodes themselves """
+        current = self.samples_current()
+        nodes = self.node_array()
+        self.pending_transform = None
+        if len(nodes):
+            self.shared = self.shared - {"_nodes"}
+            self._nodes = NodeList(map(tuple, nodes))
+        if current:
+            self.stamp_samples()
+
+    def stamp_samples(self):
+        """ Record the node values the cached samples are computed from """
+        self.sampled_stamp = (self._nodes.version, self.pending_transform)
+
+    def samples_current(self):
+        """ Whether the cached samples still match the nodes, so they may be updated in place """
+        version, transform = self.sampled_stamp
+        return version == self._nodes.version and transform is self.pending_transform
+
+    @property
+    def points(self):
+        return self._points
+
+    @points.setter
+    def points(self, points):
+        # every derived structure (hit-test index, bounding box) is keyed by revision
+        # one contiguous (n, 2) float buffer, so drawing can hand it to Qt without per-point objects
+        self.shared = self.shared - {"_points"}
+        points = np.ascontiguousarray(points, dtype=float)
+        self._points = points if points.ndim == 2 else points.reshape(-1, 2)
+        self.revision += 1
+
     def add_node(self, x, y, calculate=True):
         self.nodes.append((x, y))
         if calculate:
@@ -55,10 +137,24 @@ class Curve(object):
         if calculate:
             self.calculate_points()
 
-    def move_node(self, index, x, y, calculate=True):
+    def move_node(self, index, x, y, calculate=True, fast=False):
+        """ fast allows a coarser recalculation while dragging, when the samples cannot be updated in place """
+        old_x, old_y = self.nodes[index]
+        current = self.samples_current()
         self.nodes[index] = (x, y)
-        if calculate:
-            self.calculate_points()
+        if not calculate:
+            return
+
+        column = self.basis_column(index) if self.sampling == "uniform" and current else None
+        if column is None:
+            self.calculate_points(fast=fast)
+        else:
+            # samples are linear in the nodes, so only the moved node's share changes
+            self.points = self.points + column[:, np.newaxis] * (x - old_x, y - old_y)
+            self.stamp_samples()
+            self.arc_length_table = None
+            if self.show_convex_hull:
+                self.calculate_convex_hull()
 
     def reverse_nodes(self, calculate=True):
         self.nodes = self.nodes[::-1]
@@ -92,8 +188,34 @@ class Curve(object):
         if calculate:
             self.calculate_points()
 
+    # buffers which may be edited in place, shared between a curve and its clones until then
+    copy_on_write = ("_nodes",)
+
     def clone(self):
-        return copy.copy(self)
+        """ O(1) copy sharing nodes and cached samples with self; toolbar and model are set up again on add """
+        curve = copy.copy(self)
+
+        self.shared = self.shared | set(self.copy_on_write)
+        curve.shared = self.shared
+
+        curve.selected = False
+        curve.model = None
+        curve.toolbar = None
+        curve.extra_toolbar = None
+        curve.basis_columns = (curve.params, {})
+        curve.lod_cache = (None, {})
+        return curve
+
+    def own(self, name):
+        """ Make buffer name private to this curve before editing it in place """
+        if name in self.shared:
+            # a private copy of the nodes holds the same values, so current samples stay current
+            current = name == "_nodes" and self.samples_current()
+            value = getattr(self, name)
+            setattr(self, name, value.copy() if isinstance(value, np.ndarray) else type(value)(value))
+            self.shared = self.shared - {name}
+            if current:
+                self.stamp_samples()
 
     def setModel(self, model):
         self.model = model
@@ -202,6 +324,35 @@ class Curve(object):
             self.resolution_set_action_triggered)
         curve_properties_menu.addAction(self.resolution_set_action)
 
+        sampling_menu = curve_properties_menu.addMenu("Sampling")
+        sampling_group = QtWidgets.QActionGroup(parent)
+
+        self.uniform_sampling_action = QtWidgets.QAction("Uniform", parent)
+        self.uniform_sampling_action.triggered.connect(self.uniform_sampling_action_triggered)
+        self.uniform_sampling_action.setCheckable(True)
+        self.uniform_sampling_action.setChecked(self.sampling == "uniform")
+        sampling_group.addAction(self.uniform_sampling_action)
+        sampling_menu.addAction(self.uniform_sampling_action)
+
+        self.adaptive_sampling_action = QtWidgets.QAction("Adaptive", parent)
+        self.adaptive_sampling_action.triggered.connect(self.adaptive_sampling_action_triggered)
+        self.adaptive_sampling_action.setCheckable(True)
+        self.adaptive_sampling_action.setChecked(self.sampling == "adaptive")
+        sampling_group.addAction(self.adaptive_sampling_action)
+        sampling_menu.addAction(self.adaptive_sampling_action)
+
+        self.arc_length_sampling_action = QtWidgets.QAction("Arc length", parent)
+        self.arc_length_sampling_action.triggered.connect(self.arc_length_sampling_action_triggered)
+        self.arc_length_sampling_action.setCheckable(True)
+        self.arc_length_sampling_action.setChecked(self.sampling == "arc-length")
+        sampling_group.addAction(self.arc_length_sampling_action)
+        sampling_menu.addAction(self.arc_length_sampling_action)
+
+        self.tolerance_set_action = QtWidgets.QAction("Set tolerance", parent)
+        self.tolerance_set_action.triggered.connect(
+            self.tolerance_set_action_triggered)
+        curve_properties_menu.addAction(self.tolerance_set_action)
+
         self.node_color_action = QtWidgets.QAction("Nodes color", parent)
         self.node_color_action.triggered.connect(
             self.node_color_action_triggered)
@@ -357,125 +508,462 @@ class Curve(object):
             self.calculate_points()
             self.model.updated()
 
-    @staticmethod
-    def convex_hull(points):
-        # https://en.wikibooks.org/wiki/Algorithm_Implementation/Geometry/Convex_hull/Monotone_chain#Python
-        points = sorted(set(points))
-
-        if len(points) <= 1:
-            return points
+    def uniform_sampling_action_triggered(self, state):
+        if self.sampling != "uniform":
+            self.sampling = "uniform"
+            self.calculate_points()
+            self.model.updated()
 
-        def cross(o, a, b):
-            return (a[0] - o[0]) * (b[1] - o[1]) - (a[1] - o[1]) * (b[0] - o[0])
+    def adaptive_sampling_action_triggered(self, state):
+        if self.sampling != "adaptive":
+            self.sampling = "adaptive"
+            self.calculate_points()
+            self.model.updated()
 
-        lower = []
-        for p in points:
-            while len(lower) >= 2 and cross(lower[-2], lower[-1], p) <= 0:
-                lower.pop()
-            lower.append(p)
+    def arc_length_sampling_action_triggered(self, state):
+        if self.sampling != "arc-length":
+            self.sampling = "arc-length"
+            self.calculate_points()
+            self.model.updated()
 
-        upper = []
-        for p in reversed(points):
-            while len(upper) >= 2 and cross(upper[-2], upper[-1], p) <= 0:
-                upper.pop()
-            upper.append(p)
+    def tolerance_set_action_triggered(self):
+        tolerance, ok = QInputDialog().getDouble(self.model.parent,
+                                                 "Sampling tolerance",
+                                                 "Tolerance (px):",
+                                                 value=self.tolerance,
+                                                 min=0.01,
+                                                 max=100.0,
+                                                 decimals=2)
+        if ok and tolerance != self.tolerance:
+            logger.info(f"Sampling tolerance: {tolerance}")
+            self.tolerance = tolerance
+            if self.sampling == "adaptive":
+                self.calculate_points()
+            self.model.updated()
 
-        return lower[:-1] + upper[:-1]
+    @staticmethod
+    def convex_hull(points):
+        return NodeHull.monotone_chain(points)
 
     def calculate_convex_hull(self):
         if len(self.nodes) >= 3:
             # hull = ConvexHull(self.nodes)
             # self.convex_hull = [self.nodes[i] for i in hull.vertices]
 
-            self.convex_hull = Curve.convex_hull(self.nodes)
+            self.convex_hull = self.nodes.convex_hull()
         else:
             self.convex_hull = []
 
     def calculate_points(self, force=True, fast=False):
+        self.stamp_samples()
+        self.arc_length_table = None
         if self.show_convex_hull:
             self.calculate_convex_hull()
 
-    def distance_to_nearest_point(self, x, y):
-        dists = [(np.sqrt((x - px) ** 2 + (y - py) ** 2), i)
-                 for i, (px, py) in enumerate(self.points)]
+    def parameter_range(self):
+        return 0.0, 1.0
+
+    def node_basis(self, index):
+        """ Weight of node index in every sample of self.params, or None if samples are not linear in nodes """
+        return None
+
+    def basis_column(self, index):
+        params, columns = self.basis_columns
+        if params is not self.params:
+            params, columns = self.basis_columns = (self.params, {})
+
+        key = (index, len(self.nodes))
+        if key not in columns:
+            columns[key] = self.node_basis(index)
+        return columns[key]
+
+    def evaluate(self, ts):
+        """ Piecewise linear through the cached samples, or through the nodes before any are computed """
+        ts = np.asarray(ts, dtype=float)
+        points, params = self.points, np.asarray(self.params, dtype=float)
+        if len(points) != len(params) or len(points) < 2:
+            points = self.node_array()
+            params = np.linspace(*self.parameter_range(), len(points))
+
+        if not len(points):
+            return np.empty((len(ts), 2))
 
-        if dists:
-            dist, index = min(dists)
-            return index, dist
+        return np.column_stack((np.interp(ts, params, points[:, 0]), np.interp(ts, params, points[:, 1])))
 
-        return None, None
+    def arc_length_table_size(self):
+        return 4 * self.resolution
 
-    def nearest_node(self, x, y):
-        dists = [(np.sqrt((x - px) ** 2 + (y - py) ** 2), i) for i, (px, py) in enumerate(self.nodes)]
+    def arc_lengths(self):
+        """ Parameters and cumulative chord lengths of a dense sampling, dropped whenever the curve changes """
+        if self.arc_length_table is None:
+            t0, t1 = self.parameter_range()
+            ts = np.linspace(t0, t1, self.arc_length_table_size() + 1)
+            points = self.evaluate(ts)
+
+            lengths = np.concatenate(([0.0], np.cumsum(np.hypot(*np.diff(points, axis=0).T))))
+            self.arc_length_table = (ts, lengths)
+        return self.arc_length_table
+
+    def length(self):
+        if not self.nodes:
+            return 0.0
+
+        _, lengths = self.arc_lengths()
+        return float(lengths[-1])
+
+    def parameter_at_length(self, s):
+        ts, lengths = self.arc_lengths()
+        s = np.clip(np.asarray(s, dtype=float), 0, lengths[-1])
+
+        # binary search for the table interval, then linear inside it
+        index = np.clip(np.searchsorted(lengths, s, side='right') - 1, 0, len(lengths) - 2)
+        spans = lengths[index + 1] - lengths[index]
+        u = (s - lengths[index]) / np.where(spans > 0, spans, 1.0)
+        return ts[index] + u * (ts[index + 1] - ts[index])
+
+    def point_at_length(self, s):
+        ts = self.parameter_at_length(np.atleast_1d(s))
+        points = self.evaluate(ts)
+        return points[0] if np.ndim(s) == 0 else points
+
+    def resample(self):
+        """ Parameters and points for the non-uniform sampling modes """
+        if self.sampling == "arc-length":
+            ts = self.parameter_at_length(np.linspace(0, self.length(), self.resolution))
+            return ts, self.evaluate(ts)
+
+        return self.flatten()
+
+    @staticmethod
+    def chord_deviation(starts, ends, points):
+        # distance from points to the chord segments (not the infinite lines)
+        chords = ends - starts
+        offsets = points - starts
 
-        if dists:
-            dist, index = min(dists)
-            return index, dist
+        lengths = np.sum(chords ** 2, axis=-1)
+        u = np.sum(offsets * chords, axis=-1) / np.where(lengths > 0, lengths, 1.0)
+        u = np.clip(u, 0, 1)[..., np.newaxis]
 
-        return None, None
+        rests = offsets - u * chords
+        return np.hypot(rests[..., 0], rests[..., 1])
+
+    @staticmethod
+    def simplify(points, tolerance):
+        """ Douglas-Peucker mask of the points to keep, every dropped point lies within tolerance of its chord """
+        keep = np.zeros(len(points), dtype=bool)
+        keep[[0, -1]] = True
+
+        runs = [(0, len(points) - 1)]
+        while runs:
+            first, last = runs.pop()
+            if last - first < 2:
+                continue
+
+            deviation = Curve.chord_deviation(points[first], points[last], points[first + 1:last])
+            worst = int(np.argmax(deviation))
+            if deviation[worst] > tolerance:
+                middle = first + 1 + worst
+                keep[middle] = True
+                runs += [(first, middle), (middle, last)]
+        return keep
+
+    def flatten(self, tolerance=None, max_depth=16):
+        """ Sample curve adaptively, so that every chord stays within tolerance of the curve """
+        tolerance = self.tolerance if tolerance is None else tolerance
+        t0, t1 = self.parameter_range()
+
+        # half the tolerance for refining and half for merging nearly collinear chords afterwards
+        tolerance /= 2
+
+        # about one seed interval per knot span, so straight stretches start sparse
+        ts = np.linspace(t0, t1, max(16, len(self._nodes) - 1) + 1)
+        points = self.evaluate(ts)
+        active = np.ones(len(ts) - 1, dtype=bool)
+
+        for _ in range(max_depth):
+            indices = np.flatnonzero(active)
+            if not len(indices):
+                break
+
+            mids = (ts[indices] + ts[indices + 1]) / 2
+            mid_points = self.evaluate(mids)
+            deviation = Curve.chord_deviation(points[indices], points[indices + 1], mid_points)
+
+            split = deviation > tolerance
+            ts = np.insert(ts, indices[split] + 1, mids[split])
+            points = np.insert(points, indices[split] + 1, mid_points[split], axis=0)
+
+            # both halves of a split interval are tested again, the rest is settled
+            split_intervals = np.zeros_like(active)
+            split_intervals[indices[split]] = True
+            active = np.repeat(split_intervals, split_intervals + 1)
+
+        keep = Curve.simplify(points, tolerance)
+        return ts[keep], points[keep]
+
+    def segment_index(self):
+        """ Bounding boxes of runs of segments_per_box consecutive sample segments, rebuilt when points change """
+        revision, boxes = self.segment_boxes
+        if revision == self.revision:
+            return boxes
+
+        points = np.asarray(self.points, dtype=float)
+        if len(points) < 2:
+            boxes = None
+        else:
+            size = self.segments_per_box
+            count = -(-(len(points) - 1) // size)
+            padding = ((0, count * size - (len(points) - 1)), (0, 0))
+
+            lows = np.pad(np.minimum(points[:-1], points[1:]), padding, constant_values=np.inf)
+            highs = np.pad(np.maximum(points[:-1], points[1:]), padding, constant_values=-np.inf)
+            boxes = lows.reshape(count, size, 2).min(axis=1), highs.reshape(count, size, 2).max(axis=1)
+
+        self.segment_boxes = (self.revision, boxes)
+        return boxes
+
+    def bounding_box(self):
+        """ Tight (lows, highs) box of the curve, or None, cached until the samples change """
+        revision, box = self.bounds
+        if revision != self.revision:
+            box = self.compute_bounding_box()
+            self.bounds = (self.revision, box)
+        return box
+
+    def compute_bounding_box(self):
+        boxes = self.segment_index()
+        if boxes is None:
+            points = np.asarray(self.points, dtype=float).reshape(-1, 2)
+            return (points.min(axis=0), points.max(axis=0)) if len(points) else None
+
+        lows, highs = boxes
+        return lows.min(axis=0), highs.max(axis=0)
+
+    @staticmethod
+    def box_distance(lows, highs, x, y):
+        offsets = np.maximum(np.maximum(lows - (x, y), 0), (x, y) - highs)
+        return np.hypot(offsets[..., 0], offsets[..., 1])
+
+    def extent(self):
+        """ Box of everything draw() may paint, apart from pen width and labels """
+        box = self.bounding_box()
+        if (self.show_nodes or self.show_convex_hull) and len(self._nodes):
+            nodes = self.node_array()
+            lows, highs = nodes.min(axis=0), nodes.max(axis=0)
+            box = (lows, highs) if box is None else (np.minimum(box[0], lows), np.maximum(box[1], highs))
+        return box
+
+    def visible_in(self, lows, highs):
+        box = self.extent()
+        if box is None:
+            return False
+
+        margin = self.width + 10 + (self.node_size + 30 if self.show_nodes else 0)
+        return bool(np.all(box[0] - margin <= highs) and np.all(box[1] + margin >= lows))
+
+    @staticmethod
+    def merge_intersections(ts, other_ts, points, tolerance):
+        """ Sort hits along the curve, dropping ones that repeat the previous hit within tolerance """
+        order = np.argsort(ts, kind='stable')
+
+        intersections = []
+        for k in order:
+            point = (float(points[k, 0]), float(points[k, 1]))
+            if intersections and np.hypot(point[0] - intersections[-1][2][0],
+                                          point[1] - intersections[-1][2][1]) < tolerance:
+                continue
+            intersections.append((float(ts[k]), float(other_ts[k]), point))
+        return intersections
+
+    def intersect(self, other, tolerance=0.5):
+        """ Crossings of the sampled polylines as (t, other t, (x, y)), segment runs pruned by their boxes """
+        points, other_points = np.asarray(self.points, dtype=float), np.asarray(other.points, dtype=float)
+        if len(points) < 2 or len(other_points) < 2:
+            return []
+
+        (lows, highs), (other_lows, other_highs) = self.segment_index(), other.segment_index()
+        overlap = np.all(lows[:, np.newaxis] <= other_highs[np.newaxis], axis=-1) & \
+                  np.all(other_lows[np.newaxis] <= highs[:, np.newaxis], axis=-1)
+
+        def cross(a, b):
+            return a[..., 0] * b[..., 1] - a[..., 1] * b[..., 0]
+
+        size, other_size = self.segments_per_box, other.segments_per_box
+        ts, other_ts, hits = [], [], []
+        for box, other_box in np.argwhere(overlap):
+            first = box * size
+            starts = points[first:first + size + 1]
+            directions = np.diff(starts, axis=0)[:, np.newaxis]
+
+            other_first = other_box * other_size
+            other_starts = other_points[other_first:other_first + other_size + 1]
+            other_directions = np.diff(other_starts, axis=0)[np.newaxis]
+
+            offsets = other_starts[np.newaxis, :-1] - starts[:-1, np.newaxis]
+            denominator = cross(directions, other_directions)
+            safe = np.where(denominator != 0, denominator, 1.0)
+            u = cross(offsets, other_directions) / safe
+            v = cross(offsets, directions) / safe
+
+            # half-open on both segments, so a crossing at a shared sample is found once,
+            # but closed on the last segment of each polyline, so its end sample is not lost
+            last = (first + np.arange(len(starts) - 1) == len(points) - 2)[:, np.newaxis]
+            other_last = (other_first + np.arange(len(other_starts) - 1) == len(other_points) - 2)[np.newaxis]
+            within = (u >= 0) & ((u < 1) | (last & (u <= 1))) & (v >= 0) & ((v < 1) | (other_last & (v <= 1)))
+            i, j = np.nonzero((denominator != 0) & within)
+            u, v = u[i, j], v[i, j]
+
+            params, other_params = self.params[first:], other.params[other_first:]
+            ts.append(params[i] + u * (params[i + 1] - params[i]))
+            other_ts.append(other_params[j] + v * (other_params[j + 1] - other_params[j]))
+            hits.append(starts[i] + u[:, np.newaxis] * directions[i, 0])
+
+        if not ts:
+            return []
+        return Curve.merge_intersections(np.concatenate(ts), np.concatenate(other_ts),
+                                         np.concatenate(hits), tolerance)
+
+    def distance_to_nearest_point(self, x, y, max_dist=None):
+        points = np.asarray(self.points, dtype=float)
+        if not len(points):
+            return None, None
+
+        if len(points) == 1:
+            dist = float(np.hypot(x - points[0, 0], y - points[0, 1]))
+            return (0, dist) if max_dist is None or dist <= max_dist else (None, None)
+
+        # distances to polyline segments, so sparse (adaptive) samples are hit-tested correctly;
+        # runs of segments are visited nearest box first and skipped once their box is too far
+        lows, highs = self.segment_index()
+        box_dists = Curve.box_distance(lows, highs, x, y)
+        best_dist = np.inf if max_dist is None else max_dist
+        segment = None
+
+        size = self.segments_per_box
+        for box in np.argsort(box_dists):
+            if box_dists[box] > best_dist:
+                break
+
+            starts = points[box * size:(box + 1) * size]
+            ends = points[box * size + 1:(box + 1) * size + 1]
+            dists = Curve.chord_deviation(starts[:len(ends)], ends, np.array([x, y]))
+
+            nearest = int(np.argmin(dists))
+            if dists[nearest] <= best_dist:
+                best_dist, segment = float(dists[nearest]), box * size + nearest
+
+        if segment is None:
+            return None, None
+
+        d1 = np.hypot(*(points[segment] - (x, y)))
+        d2 = np.hypot(*(points[segment + 1] - (x, y)))
+        index = segment + 1 if d2 < d1 else segment
+        return index, best_dist
+
+    def nearest_node(self, x, y, max_dist=None, exclude=None):
+        return self.nodes.index_grid(max_dist).nearest(x, y, max_dist=max_dist, exclude=exclude)
+
+    @staticmethod
+    def polyline(points):
+        """ QPolygonF filled straight from a float buffer, without a QPointF per vertex """
+        points = np.ascontiguousarray(points, dtype=float).reshape(-1, 2)
+
+        polygon = QtGui.QPolygonF()
+        polygon.fill(QtCore.QPointF(), len(points))
+        if len(points):
+            buffer = polygon.data()
+            buffer.setsize(points.nbytes)
+            np.frombuffer(buffer, dtype=float).reshape(-1, 2)[:] = points
+        return polygon
+
+    def pens(self):
+        """ Pens and brush for the current style, rebuilt only when a colour or width changes """
+        key = (self.color.rgba(), self.width, self.node_color.rgba(), self.highlight_color.rgba())
+        cached_key, pens = self.pen_cache
+        if cached_key != key:
+            pens = {
+                "curve": QtGui.QPen(self.color, self.width, QtCore.Qt.SolidLine),
+                "highlight": QtGui.QPen(self.highlight_color, self.width + 10, QtCore.Qt.SolidLine),
+                "node": QtGui.QPen(self.node_color, 1, QtCore.Qt.DashLine),
+                "node_brush": QtGui.QBrush(self.node_color),
+            }
+            self.pen_cache = (key, pens)
+        return pens
 
     def draw_convex_hull(self, qp: QtGui.QPainter):
         points = self.convex_hull
         if len(points) < 2:
             return
 
-        greenPen = QtGui.QPen(QtCore.Qt.green, 1, QtCore.Qt.DashLine)
-        qp.setPen(greenPen)
-        for i in range(len(points) - 1):
-            qp.drawLine(points[i][0], points[i][1], points[i + 1][0], points[i + 1][1])
+        qp.setPen(HULL_PEN)
+        qp.drawPolyline(self.polyline(list(points) + [points[0]]))
 
-        qp.drawLine(points[-1][0], points[-1][1], points[0][0], points[0][1])
+    @staticmethod
+    def lod_level(scale):
+        """ Zoom levels step by sqrt(2); a level decimates for the finest scale it covers """
+        return int(np.ceil(2 * np.log2(scale)))
 
-    def draw_highlight(self, qp: QtGui.QPainter):
-        highlight_pen = QtGui.QPen(self.highlight_color, self.width + 10, QtCore.Qt.SolidLine)
-        qp.setPen(highlight_pen)
+    @staticmethod
+    def decimate(points, scale, tolerance=0.5):
+        """ Keep only samples entering a new screen cell of tolerance pixels; the ends are always kept """
+        if len(points) < 3:
+            return points
 
-        points = self.points
+        cells = np.floor(points * (scale / tolerance))
+        keep = np.empty(len(points), dtype=bool)
+        keep[0] = keep[-1] = True
+        keep[1:-1] = np.any(cells[1:-1] != cells[:-2], axis=1)
+        return points[keep]
+
+    def screen_points(self, scale=1.0):
+        """ Samples decimated for drawing at scale, cached per zoom level until the samples change """
+        revision, levels = self.lod_cache
+        if revision != self.revision:
+            revision, levels = self.lod_cache = (self.revision, {})
+
+        level = Curve.lod_level(scale)
+        if level not in levels:
+            levels[level] = Curve.decimate(self.points, 2 ** (level / 2))
+        return levels[level]
+
+    def draw_highlight(self, qp: QtGui.QPainter, scale=1.0):
+        points = self.screen_points(scale)
         if len(points) < 2:
             return
 
-        for i in range(len(points) - 1):
-            p1 = QtCore.QPointF(*points[i])
-            p2 = QtCore.QPointF(*points[i + 1])
-            qp.drawLine(p1, p2)
-
-    def draw_points(self, qp: QtGui.QPainter):
-        pen = QtGui.QPen(self.color, self.width, QtCore.Qt.SolidLine)
-        qp.setPen(pen)
+        qp.setPen(self.pens()["highlight"])
+        qp.drawPolyline(self.polyline(points))
 
-        points = self.points
+    def draw_points(self, qp: QtGui.QPainter, scale=1.0):
+        points = self.screen_points(scale)
         if len(points) < 2:
             return
 
-        for i in range(len(points) - 1):
-            p1 = QtCore.QPointF(*points[i])
-            p2 = QtCore.QPointF(*points[i + 1])
-            qp.drawLine(p1, p2)
+        qp.setPen(self.pens()["curve"])
+        qp.drawPolyline(self.polyline(points))
 
     def draw_nodes(self, qp: QtGui.QPainter):
-        red_pen = QtGui.QPen(self.node_color, 1, QtCore.Qt.DashLine)
-        red_brush = QtGui.QBrush(self.node_color)
-
-        qp.setPen(red_pen)
-        qp.setBrush(red_brush)
+        pens = self.pens()
+        qp.setPen(pens["node"])
+        qp.setBrush(pens["node_brush"])
 
+        # drawn from node_array(), so a pending transform is not folded on every frame
         node_size = self.node_size
-        old_point = self.nodes[0]
-        qp.drawEllipse(QtCore.QPointF(old_point[0] - 3, old_point[1] - 3), node_size, node_size)
-        qp.drawText(old_point[0] + 5, old_point[1] - 3, '1')
-        for i, point in enumerate(self.nodes[1:]):
-            i += 2
-            qp.drawEllipse(QtCore.QPointF(point[0] - 3, point[1] - 3), node_size, node_size)
-            qp.drawText(point[0] + 5, point[1] - 3, f'{i}')
-
-    def draw(self, qp: QtGui.QPainter):
-        if self.hidden or not self.nodes:
+        for i, (x, y) in enumerate(self.node_array(), 1):
+            qp.drawEllipse(QtCore.QPointF(x - 3, y - 3), node_size, node_size)
+            qp.drawText(QtCore.QPointF(x + 5, y - 3), f'{i}')
+
+    def draw(self, qp: QtGui.QPainter, visible=None, scale=1.0):
+        if self.hidden or not len(self._nodes):
+            return
+
+        if visible is not None and not self.visible_in(*visible):
             return
 
         if self.selected:
-            self.draw_highlight(qp)
+            self.draw_highlight(qp, scale)
 
-        self.draw_points(qp)
+        self.draw_points(qp, scale)
 
         if self.show_nodes:
             logger.info("Drawing nodes")
@@ -485,45 +973,91 @@ class Curve(object):
             logger.info("Drawing convex hull")
             self.draw_convex_hull(qp)
 
+    def layer_key(self):
+        """ Everything the drawn layer depends on; the samples, nodes and hull change together with revision """
+        return (self.revision, len(self._nodes), self.selected, self.show_nodes, self.show_convex_hull,
+                self.color.rgba(), self.width, self.node_color.rgba(), self.node_size, self.highlight_color.rgba())
+
+    def render_layer(self, scale=1.0):
+        """ QPicture with this curve drawn for scale, recorded again only when layer_key() or the zoom level change """
+        key = self.layer_key() + (Curve.lod_level(scale),)
+        cached_key, picture = self.layer_cache
+        if cached_key != key:
+            picture = QtGui.QPicture()
+            qp = QtGui.QPainter(picture)
+            self.draw(qp, scale=scale)
+            qp.end()
+
+            self.layer_cache = (key, picture)
+        return picture
+
     def calculate_center(self):
-        center = [0, 0]
-        for (x, y) in self.nodes:
-            center[0] += x
-            center[1] += y
+        x, y = self.node_array().mean(axis=0)
+        return x, y
 
-        n = len(self.nodes)
-        center = (center[0] / n, center[1] / n)
-        return center
+    def transforms_points(self, matrix):
+        """ Whether samples of the transformed curve are the transformed samples """
+        if not isinstance(self.points, np.ndarray) or len(self.points) != len(self.params):
+            return False
 
-    def translate(self, dx, dy, calculate=True):
-        self.nodes = [(x + dx, y + dy) for x, y in self.nodes]
-        if calculate:
-            self.calculate_points()
+        gram = matrix @ matrix.T
+        if self.sampling == "arc-length":
+            # similarities scale every length alike, so arc-length parameters are kept
+            return np.allclose(gram, gram[0, 0] * np.eye(2))
 
-    def scale(self, scalar, calculate=True):
-        (cx, cy) = self.calculate_center()
+        # adaptive samples only stay within tolerance under rigid motions
+        return self.sampling == "uniform" or np.allclose(gram, np.eye(2))
 
-        for i, (x, y) in enumerate(self.nodes):
-            dx, dy = x - cx, y - cy
-            self.nodes[i] = (cx + dx * scalar, cy + dy * scalar)
+    def transform_points(self, matrix, offset):
+        self.points = self.points @ matrix.T + offset
 
-        if calculate:
-            self.calculate_points()
+    def transform(self, matrix, offset, calculate=True):
+        """ Affine map x -> matrix @ x + offset, applied to cached samples and folded into nodes lazily """
+        matrix, offset = np.asarray(matrix, dtype=float), np.asarray(offset, dtype=float)
+
+        affine = np.eye(3)
+        affine[:2, :2], affine[:2, 2] = matrix, offset
+        pending = affine if self.pending_transform is None else affine @ self.pending_transform
+
+        if not calculate or not self.samples_current() or not self.transforms_points(matrix):
+            self.pending_transform = pending
+            if calculate:
+                self.calculate_points()
+            return
+
+        revision, boxes = self.segment_boxes
+        bounds_revision, box = self.bounds
+        self.transform_points(matrix, offset)
+        self.arc_length_table = None
+        self.pending_transform = pending
+        self.stamp_samples()
+
+        if np.array_equal(matrix, np.eye(2)):
+            # a translation moves the hit-test boxes and the bounding box along with the samples
+            if boxes is not None and revision == self.revision - 1:
+                self.segment_boxes = (self.revision, (boxes[0] + offset, boxes[1] + offset))
+            if box is not None and bounds_revision == self.revision - 1:
+                self.bounds = (self.revision, (box[0] + offset, box[1] + offset))
+
+        if self.show_convex_hull and len(self.convex_hull):
+            hull = np.array(self.convex_hull, dtype=float) @ matrix.T + offset
+            self.convex_hull = list(map(tuple, hull))
+
+    def translate(self, dx, dy, calculate=True):
+        self.transform(np.eye(2), (dx, dy), calculate=calculate)
+
+    def scale(self, scalar, calculate=True):
+        center = np.array(self.calculate_center())
+        self.transform(scalar * np.eye(2), center - scalar * center, calculate=calculate)
 
     def rotate(self, theta, calculate=True):
         theta = theta * np.pi / 180
 
-        center = np.array(self.calculate_center()).reshape(2, 1)
-        nodes = np.array(self.nodes).T
-
+        center = np.array(self.calculate_center())
         rotate_matrix = np.array([[np.cos(theta), -np.sin(theta)],
                                   [np.sin(theta), np.cos(theta)]])
 
-        new_nodes = center + rotate_matrix.dot(nodes - center)
-        self.nodes = [(x, y) for x, y in new_nodes.T]
-
-        if calculate:
-            self.calculate_points()
+        self.transform(rotate_matrix, center - rotate_matrix @ center, calculate=calculate)
 
     def hide(self, state):
         self.hidden = state
@@ -538,7 +1072,9 @@ class Curve(object):
             "width": self.width,
             "node_color": self.node_color.getRgb(),
             "node_size": self.node_size,
-            "resolution": self.resolution
+            "resolution": self.resolution,
+            "sampling": self.sampling,
+            "tolerance": self.tolerance
         }
         return data
 
@@ -553,6 +1089,8 @@ class Curve(object):
         curve.node_color = QtGui.QColor.fromRgb(*data["node_color"])
         curve.node_size = data["node_size"]
         curve.resolution = data["resolution"]
+        curve.sampling = data.get("sampling", "uniform")
+        curve.tolerance = data.get("tolerance", 0.5)
 
         if calculate:
             curve.calculate_points()
@@ -1,6 +1,8 @@
 import logging
+from functools import lru_cache
 
 import numpy as np
+from scipy.special import comb
 from PyQt5 import QtWidgets
 
 from .curves import Curve
@@ -51,41 +53,77 @@ class InterpolationPolynomialCurve(Curve):
         self.nodes_type_button.setMenu(nodes_type_menu)
         self.extra_toolbar.addWidget(self.nodes_type_button)
 
-    def calculate_points(self, force=True, fast=False):
-        super().calculate_points()
-
-        if not self.nodes:
-            self.points = []
-            return self.points
+    @staticmethod
+    @lru_cache(maxsize=64)
+    def barycentric_nodes(n, nodes_type):
+        # weights are only defined up to a common factor, which cancels out in the barycentric formula
+        i = np.arange(n + 1)
 
-        n = len(self.nodes) - 1
-        nodes = np.array(self.nodes)
-
-        if self.nodes_type == "equidistant":
+        if nodes_type == "equidistant":
             # Equidistant nodes
             ts = np.linspace(0, 1, n + 1)
-            omegas = [(-1) ** i * n ** n / (np.math.factorial(i) * np.math.factorial(n - i))
-                      for i in range(n + 1)]
+            omegas = (-1.) ** i * comb(n, i)
         else:
             # Chebyshev nodes
-            ts = np.array([np.cos((2 * i + 1) * np.pi / (2 * n + 2)) for i in range(n + 1)])
-            omegas = [(-1) ** i * 2 ** (-3 * n) * (n + 1) * np.sin((2 * i + 1) * np.pi / (2 * n + 2)) ** (-1)
-                      for i in range(n + 1)]
+            angles = (2 * i + 1) * np.pi / (2 * n + 2)
+            ts = np.cos(angles)
+            omegas = (-1.) ** i / np.sin(angles)
+
+        ts.setflags(write=False)
+        omegas.setflags(write=False)
+        return ts, omegas
+
+    def interpolation_nodes(self):
+        return InterpolationPolynomialCurve.barycentric_nodes(len(self.nodes) - 1, self.nodes_type)
+
+    def parameter_range(self):
+        ts, _ = self.interpolation_nodes()
+        return ts[0], ts[-1]
+
+    def evaluate(self, params):
+        nodes = self.node_array()
+        ts, omegas = self.interpolation_nodes()
+
+        differences = np.asarray(params, dtype=float).reshape(-1, 1) - ts
+        hits = np.abs(differences) < 1e-5
+        hit_rows = hits.any(axis=1)
 
-        def p(t):
-            k = np.argmin(np.abs(ts - t))
-            if abs(ts[k] - t) < 1e-5:
-                return nodes[k]
+        terms = omegas / np.where(hits, 1.0, differences)
+        points = (terms @ nodes) / terms.sum(axis=1)[:, np.newaxis]
 
-            denominator = sum(omegas[i] / (t - ts[i]) for i in range(n + 1))
-            numerator = sum(nodes[i] * omegas[i] / (t - ts[i]) for i in range(n + 1))
+        # parameters lying on an interpolation node take the node itself
+        points[hit_rows] = nodes[np.argmax(hits[hit_rows], axis=1)]
+        return points
 
-            return numerator / denominator
+    def node_basis(self, index):
+        if not isinstance(self.points, np.ndarray) or len(self.points) != len(self.params):
+            return None
+
+        ts, omegas = self.interpolation_nodes()
+        differences = self.params[:, np.newaxis] - ts
+        hits = np.abs(differences) < 1e-5
+
+        # Lagrange polynomial of the node, with the same masking as evaluate
+        terms = omegas / np.where(hits, 1.0, differences)
+        column = terms[:, index] / terms.sum(axis=1)
+        hit_rows = hits.any(axis=1)
+        column[hit_rows] = hits[hit_rows, index]
+        return column
+
+    def calculate_points(self, force=True, fast=False):
+        super().calculate_points()
+
+        if not self.nodes:
+            self.points = []
+            return self.points
+
+        if self.sampling != "uniform":
+            self.params, self.points = self.resample()
+            return self.points
 
-        steps = self.resolution
-        if fast:
-            steps = max(20, self.resolution // 10)
-        points = [tuple(p(t)) for t in np.linspace(ts[0], ts[-1], steps)]
+        t0, t1 = self.parameter_range()
+        self.params = np.linspace(t0, t1, self.resolution)
+        points = self.evaluate(self.params)
 
         self.points = points
         return self.points
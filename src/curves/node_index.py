@@ -0,0 +1,356 @@
+import itertools
+
+import numpy as np
+
+
+class NodeGrid(object):
+    """ Uniform grid bucketing nodes by position, for nearest node queries """
+
+    def __init__(self, nodes=(), cell_size=16.0):
+        self.cell_size = cell_size
+        self.cells = {}
+
+        # nodes are bucketed by a stable id, so removing one leaves the others where they are
+        self.positions = {}
+        self.ids = []
+        self.next_id = 0
+
+        for x, y in nodes:
+            self.append(x, y)
+
+    def cell(self, x, y):
+        return int(x // self.cell_size), int(y // self.cell_size)
+
+    def new_id(self):
+        node_id, self.next_id = self.next_id, self.next_id + 1
+        return node_id
+
+    def _add(self, node_id, x, y):
+        self.positions[node_id] = (x, y)
+        self.cells.setdefault(self.cell(x, y), set()).add(node_id)
+
+    def _discard(self, node_id):
+        key = self.cell(*self.positions.pop(node_id))
+        bucket = self.cells[key]
+        bucket.discard(node_id)
+        if not bucket:
+            del self.cells[key]
+
+    def resize(self, cell_size):
+        """ Re-bucket every node into cells of the given size """
+        self.cell_size = cell_size
+        self.cells = {}
+        for node_id, (x, y) in self.positions.items():
+            self.cells.setdefault(self.cell(x, y), set()).add(node_id)
+
+    def fit(self, radius):
+        """ Keep cells about as wide as the pick radius, so a query visits a few cells at any zoom """
+        if radius and not self.cell_size / 2 <= radius <= self.cell_size * 2:
+            self.resize(radius)
+        return self
+
+    def append(self, x, y):
+        node_id = self.new_id()
+        self.ids.append(node_id)
+        self._add(node_id, x, y)
+
+    def move(self, index, x, y):
+        node_id = self.ids[index]
+        self._discard(node_id)
+        self._add(node_id, x, y)
+
+    def pop(self, index=-1):
+        self._discard(self.ids.pop(index))
+
+    def closest(self, x, y, max_dist=None, skip=()):
+        """ Id and distance of the closest node within max_dist, ties going to the older node """
+        if max_dist is None:
+            candidates = self.positions
+        else:
+            (x0, y0), (x1, y1) = self.cell(x - max_dist, y - max_dist), self.cell(x + max_dist, y + max_dist)
+            candidates = [node_id for cx in range(x0, x1 + 1) for cy in range(y0, y1 + 1)
+                          for node_id in self.cells.get((cx, cy), ())]
+
+        best_id, best_dist = None, max_dist
+        for node_id in candidates:
+            if node_id in skip:
+                continue
+
+            px, py = self.positions[node_id]
+            dist = float(np.hypot(px - x, py - y))
+            if best_dist is None or dist < best_dist or (dist == best_dist and (best_id is None or node_id < best_id)):
+                best_id, best_dist = node_id, dist
+
+        if best_id is None:
+            return None, None
+        return best_id, best_dist
+
+    def nearest(self, x, y, max_dist=None, exclude=None):
+        skip = {self.ids[exclude]} if exclude is not None and exclude < len(self.ids) else ()
+
+        node_id, dist = self.closest(x, y, max_dist, skip)
+        if node_id is None:
+            return None, None
+        return self.ids.index(node_id), dist
+
+
+class SceneNodes(object):
+    """ Nodes of one curve in a SceneNodeGrid, kept in step by the hooks of the curve's node list """
+
+    def __init__(self, grid, curve):
+        self.grid = grid
+        self.curve = curve
+        self.nodes = curve._nodes
+        self.transform = curve.pending_transform
+        self.ids = []
+
+        for x, y in curve.node_array():
+            self.append(x, y, mapped=True)
+        self.nodes.indexes[self] = self
+
+    def tracks(self, curve):
+        # a replaced node list or a new pending transform means the positions have to be read again
+        return curve._nodes is self.nodes and self in curve._nodes.indexes and \
+            curve.pending_transform is self.transform
+
+    def detach(self):
+        self.nodes.indexes.pop(self, None)
+        for node_id in self.ids:
+            self.grid._discard(node_id)
+            del self.grid.owners[node_id]
+        self.ids = []
+
+    def map(self, x, y):
+        if self.transform is None:
+            return x, y
+        return tuple(self.transform[:2, :2] @ (x, y) + self.transform[:2, 2])
+
+    # hooks run before the node list changes
+
+    def append(self, x, y, mapped=False):
+        node_id = self.grid.new_id()
+        self.ids.append(node_id)
+        self.grid.owners[node_id] = self.curve
+        self.grid._add(node_id, *((x, y) if mapped else self.map(x, y)))
+
+    def move(self, index, x, y):
+        node_id = self.ids[index]
+        self.grid._discard(node_id)
+        self.grid._add(node_id, *self.map(x, y))
+
+    def pop(self, index=-1):
+        node_id = self.ids.pop(index)
+        self.grid._discard(node_id)
+        del self.grid.owners[node_id]
+
+
+class SceneNodeGrid(NodeGrid):
+    """ One grid over the nodes of every curve in a scene, answering with (curve, node index) """
+
+    def __init__(self, cell_size=16.0):
+        super().__init__(cell_size=cell_size)
+        self.owners = {}
+        self.members = {}
+
+    def sync(self, curves):
+        """ Drop removed curves and re-read curves whose nodes changed behind the hooks' back """
+        current = set(curves)
+        for curve in [curve for curve in self.members if curve not in current]:
+            self.members.pop(curve).detach()
+
+        for curve in curves:
+            member = self.members.get(curve)
+            if member is None or not member.tracks(curve):
+                if member is not None:
+                    member.detach()
+                self.members[curve] = SceneNodes(self, curve)
+
+    def nearest_node(self, x, y, max_dist=None, exclude=None):
+        """ (curve, node index, distance) of the nearest node, exclude is a (curve, node index) pair to skip """
+        skip = ()
+        if exclude is not None and exclude[0] in self.members:
+            ids = self.members[exclude[0]].ids
+            skip = {ids[exclude[1]]} if exclude[1] < len(ids) else ()
+
+        node_id, dist = self.closest(x, y, max_dist, skip)
+        if node_id is None:
+            return None, None, None
+
+        curve = self.owners[node_id]
+        return curve, self.members[curve].ids.index(node_id), dist
+
+
+class NodeHull(object):
+    """ Convex hull of a node list, only rebuilt when a hull vertex moves away or is removed """
+
+    def __init__(self, nodes):
+        self.nodes = nodes
+        self.vertices = []
+        self.stale = True
+
+    @staticmethod
+    def cross(o, a, b):
+        return (a[0] - o[0]) * (b[1] - o[1]) - (a[1] - o[1]) * (b[0] - o[0])
+
+    @staticmethod
+    def monotone_chain(points):
+        # https://en.wikibooks.org/wiki/Algorithm_Implementation/Geometry/Convex_hull/Monotone_chain#Python
+        points = sorted(set(points))
+
+        if len(points) <= 1:
+            return points
+
+        cross = NodeHull.cross
+
+        lower = []
+        for p in points:
+            while len(lower) >= 2 and cross(lower[-2], lower[-1], p) <= 0:
+                lower.pop()
+            lower.append(p)
+
+        upper = []
+        for p in reversed(points):
+            while len(upper) >= 2 and cross(upper[-2], upper[-1], p) <= 0:
+                upper.pop()
+            upper.append(p)
+
+        return lower[:-1] + upper[:-1]
+
+    @staticmethod
+    def inside(polygon, points, strict=False):
+        """ Which points lie in the counter-clockwise convex polygon """
+        polygon = np.asarray(polygon, dtype=float)
+        points = np.asarray(points, dtype=float).reshape(-1, 2)
+        if len(polygon) < 3:
+            return np.zeros(len(points), dtype=bool)
+
+        starts, ends = polygon, np.roll(polygon, -1, axis=0)
+        crosses = (ends[:, 0] - starts[:, 0]) * (points[:, 1, np.newaxis] - starts[:, 1]) - \
+                  (ends[:, 1] - starts[:, 1]) * (points[:, 0, np.newaxis] - starts[:, 0])
+        return (crosses > 0).all(axis=1) if strict else (crosses >= 0).all(axis=1)
+
+    @staticmethod
+    def build(nodes):
+        """ Monotone chain over the nodes that survive a vectorized Akl-Toussaint prefilter """
+        points = np.array(nodes, dtype=float).reshape(-1, 2)
+        if len(points) > 8:
+            # nodes strictly inside the hull of the 8 extreme nodes can never be hull vertices
+            xs, ys = points[:, 0], points[:, 1]
+            extremes = points[[xs.argmin(), xs.argmax(), ys.argmin(), ys.argmax(),
+                               (xs + ys).argmin(), (xs + ys).argmax(), (xs - ys).argmin(), (xs - ys).argmax()]]
+            polygon = NodeHull.monotone_chain(list(map(tuple, extremes)))
+            points = points[~NodeHull.inside(polygon, points, strict=True)]
+
+        return NodeHull.monotone_chain(list(map(tuple, points)))
+
+    def hull(self):
+        if self.stale:
+            self.vertices = NodeHull.build(self.nodes)
+            self.stale = False
+        return self.vertices
+
+    def add(self, x, y):
+        if not self.stale and not NodeHull.inside(self.vertices, (x, y))[0]:
+            self.vertices = NodeHull.monotone_chain(self.vertices + [(x, y)])
+
+    def is_vertex(self, index):
+        return tuple(self.nodes[index]) in set(self.vertices)
+
+    # hooks run before the node list changes, so self.nodes still holds the old node
+
+    def append(self, x, y):
+        self.add(x, y)
+
+    def move(self, index, x, y):
+        if self.stale or self.is_vertex(index):
+            self.stale = True
+        else:
+            self.add(x, y)
+
+    def pop(self, index=-1):
+        if self.stale or self.is_vertex(index):
+            self.stale = True
+
+
+class NodeList(list):
+    """ List of nodes which keeps its indexes (NodeGrid, NodeHull) in step with in-place edits """
+
+    # every list and every edit gets a fresh version, so a version names one state of one list
+    versions = itertools.count()
+
+    def __init__(self, nodes=()):
+        super().__init__(nodes)
+        self.indexes = {}
+        self.version = next(NodeList.versions)
+
+    def touch(self):
+        self.version = next(NodeList.versions)
+
+    def cached(self, kind):
+        if kind not in self.indexes:
+            self.indexes[kind] = kind(self)
+        return self.indexes[kind]
+
+    def index_grid(self, radius=None):
+        return self.cached(NodeGrid).fit(radius)
+
+    def convex_hull(self):
+        return self.cached(NodeHull).hull()
+
+    def invalidate(self):
+        self.indexes = {}
+        self.touch()
+
+    def append(self, node):
+        for index in self.indexes.values():
+            index.append(*node)
+        super().append(node)
+        self.touch()
+
+    def pop(self, index=-1):
+        for kind in self.indexes.values():
+            kind.pop(index)
+        self.touch()
+        return super().pop(index)
+
+    def __setitem__(self, index, node):
+        self.touch()
+        if isinstance(index, slice):
+            self.invalidate()
+        else:
+            for kind in self.indexes.values():
+                kind.move(index % len(self), *node)
+        super().__setitem__(index, node)
+
+    def __delitem__(self, index):
+        super().__delitem__(index)
+        self.invalidate()
+
+    def __iadd__(self, nodes):
+        result = super().__iadd__(nodes)
+        self.invalidate()
+        return result
+
+    def insert(self, index, node):
+        super().insert(index, node)
+        self.invalidate()
+
+    def extend(self, nodes):
+        super().extend(nodes)
+        self.invalidate()
+
+    def remove(self, node):
+        super().remove(node)
+        self.invalidate()
+
+    def clear(self):
+        super().clear()
+        self.invalidate()
+
+    def reverse(self):
+        super().reverse()
+        self.invalidate()
+
+    def sort(self, *args, **kwargs):
+        super().sort(*args, **kwargs)
+        self.invalidate()
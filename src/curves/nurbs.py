@@ -0,0 +1,212 @@
+import logging
+
+import numpy as np
+from PyQt5 import QtWidgets
+from PyQt5.QtWidgets import QInputDialog
+
+from .weighted_curve import WeightedCurve
+
+logger = logging.getLogger('curve-editor')
+
+
+class NURBSCurve(WeightedCurve):
+    type = "NURBS Curve"
+
+    copy_on_write = WeightedCurve.copy_on_write + ("_points", "homogeneous_points")
+
+    def __init__(self, name, nodes=None, weights=None, degree=3, knots=None):
+        super().__init__(name, nodes, weights)
+
+        self.degree = degree
+        self.knots = knots  # None means clamped uniform knots
+
+        self.spans = np.empty(0, dtype=int)
+        self.basis = np.empty((0, 1))
+        self.homogeneous_points = np.empty((0, 3))
+
+    def effective_degree(self):
+        return max(0, min(self.degree, len(self._nodes) - 1))
+
+    def knot_vector(self):
+        n, p = len(self._nodes) - 1, self.effective_degree()
+
+        if self.knots is not None and len(self.knots) == n + p + 2:
+            return np.asarray(self.knots, dtype=float)
+
+        interior = np.linspace(0, 1, n - p + 2)
+        return np.concatenate((np.zeros(p), interior, np.ones(p)))
+
+    def parameter_range(self):
+        knots, p = self.knot_vector(), self.effective_degree()
+        return knots[p], knots[len(self._nodes)]
+
+    @staticmethod
+    def basis_functions(ts, degree, knots, n):
+        """ Knot spans of ts and the degree + 1 basis functions that do not vanish there (Cox-de Boor) """
+        ts = np.asarray(ts, dtype=float)
+        spans = np.clip(np.searchsorted(knots, ts, side='right') - 1, degree, n)
+
+        basis = np.zeros((len(ts), degree + 1))
+        basis[:, 0] = 1.0
+        left = np.zeros_like(basis)
+        right = np.zeros_like(basis)
+
+        for j in range(1, degree + 1):
+            left[:, j] = ts - knots[spans + 1 - j]
+            right[:, j] = knots[spans + j] - ts
+
+            saved = np.zeros(len(ts))
+            for r in range(j):
+                temp = basis[:, r] / (right[:, r + 1] + left[:, j - r])
+                basis[:, r] = saved + right[:, r + 1] * temp
+                saved = left[:, j - r] * temp
+            basis[:, j] = saved
+
+        return spans, basis
+
+    def evaluate_homogeneous(self, spans, basis):
+        p = basis.shape[1] - 1
+        indices = spans[:, np.newaxis] - p + np.arange(p + 1)
+        return np.einsum('ij,ijk->ik', basis, self.homogeneous_nodes()[indices])
+
+    def evaluate(self, ts):
+        spans, basis = NURBSCurve.basis_functions(ts, self.effective_degree(), self.knot_vector(),
+                                                  len(self._nodes) - 1)
+        homogeneous = self.evaluate_homogeneous(spans, basis)
+        return homogeneous[:, :2] / homogeneous[:, 2:]
+
+    def update_node(self, index, delta, current):
+        """ Add delta to homogeneous node index, re-evaluating only the samples in its knot spans;
+        current tells whether the samples matched the nodes before this edit """
+        p = self.basis.shape[1] - 1
+        stale = not current or len(self.homogeneous_points) != len(self.params) \
+            or len(self.points) != len(self.params) or not len(self.spans)
+        if self.sampling != "uniform" or p != self.effective_degree() or stale:
+            self.calculate_points()
+            return
+
+        self.own("_points")
+        self.own("homogeneous_points")
+
+        local = index - (self.spans - p)
+        rows = np.flatnonzero((local >= 0) & (local <= p))
+
+        self.homogeneous_points[rows] += self.basis[rows, local[rows], np.newaxis] * delta
+        self.points[rows] = self.homogeneous_points[rows, :2] / self.homogeneous_points[rows, 2:]
+        self.stamp_samples()
+        self.revision += 1
+        self.arc_length_table = None
+
+        if self.show_convex_hull:
+            self.calculate_convex_hull()
+
+    # explicit knots are tied to the node count and order, the edits below fall back to clamped uniform knots
+
+    def add_node(self, x, y, calculate=True):
+        self.knots = None
+        super().add_node(x, y, calculate)
+
+    def remove_node(self, index, calculate=True):
+        self.knots = None
+        super().remove_node(index, calculate)
+
+    def change_nodes_order(self, index1, index2, mode, calculate=True):
+        self.knots = None
+        super().change_nodes_order(index1, index2, mode, calculate)
+
+    def reverse_nodes(self, calculate=True):
+        if self.knots is not None:
+            # the reversed curve is the same one traced backwards, over the mirrored knots
+            knots = np.asarray(self.knots, dtype=float)
+            self.knots = list(knots[0] + knots[-1] - knots[::-1])
+        super().reverse_nodes(calculate)
+
+    def transforms_points(self, matrix):
+        return super().transforms_points(matrix) and len(self.homogeneous_points) == len(self.params)
+
+    def transform_points(self, matrix, offset):
+        # w * (A p + b) = A (w p) + w b
+        homogeneous = self.homogeneous_points.copy()
+        homogeneous[:, :2] = homogeneous[:, :2] @ matrix.T + homogeneous[:, 2:] * offset
+
+        self.homogeneous_points = homogeneous
+        self.points = homogeneous[:, :2] / homogeneous[:, 2:]
+
+    def move_node(self, index, x, y, calculate=True, fast=False):
+        old_x, old_y = self.nodes[index]
+        current = self.samples_current()
+        self.nodes[index] = (x, y)
+
+        if calculate:
+            weight = self.weights[index]
+            self.update_node(index, np.array([(x - old_x) * weight, (y - old_y) * weight, 0.0]), current)
+
+    def set_node_weight(self, index, weight, calculate=True):
+        old_weight = self.weights[index]
+        current = self.samples_current()
+        self.weights[index] = weight
+
+        if calculate:
+            x, y = self.nodes[index]
+            self.update_node(index, (weight - old_weight) * np.array([x, y, 1.0]), current)
+
+    def setup_toolbar(self, parent):
+        super().setup_toolbar(parent)
+
+        self.set_degree_action = QtWidgets.QAction("Set degree", parent)
+        self.set_degree_action.triggered.connect(self.set_degree_action_triggered)
+        self.extra_toolbar.addAction(self.set_degree_action)
+
+    def set_degree_action_triggered(self, state):
+        degree, ok = QInputDialog().getInt(self.model.parent,
+                                           "NURBS degree",
+                                           "Degree:",
+                                           value=self.degree,
+                                           min=1,
+                                           max=10,
+                                           step=1)
+        if ok and degree != self.degree:
+            logger.info(f"NURBS degree: {degree}")
+            self.degree = degree
+            self.knots = None
+            self.calculate_points()
+            self.model.updated()
+
+    def calculate_points(self, force=True, fast=False):
+        super().calculate_points()
+
+        if not self.nodes:
+            self.points = []
+            return self.points
+
+        if self.sampling != "uniform":
+            self.homogeneous_points = np.empty((0, 3))
+            self.params, self.points = self.resample()
+            return self.points
+
+        t0, t1 = self.parameter_range()
+        self.params = np.linspace(t0, t1, self.resolution)
+
+        self.spans, self.basis = NURBSCurve.basis_functions(self.params, self.effective_degree(),
+                                                            self.knot_vector(), len(self._nodes) - 1)
+        self.homogeneous_points = self.evaluate_homogeneous(self.spans, self.basis)
+
+        self.points = self.homogeneous_points[:, :2] / self.homogeneous_points[:, 2:]
+        return self.points
+
+    def to_dict(self):
+        data = super().to_dict()
+
+        data["degree"] = self.degree
+        data["knots"] = self.knots
+        return data
+
+    @classmethod
+    def from_dict(cls, data, calculate=True):
+        curve = super().from_dict(data, calculate=False)
+        curve.degree = data.get("degree", 3)
+        curve.knots = data.get("knots")
+
+        if calculate:
+            curve.calculate_points()
+        return curve
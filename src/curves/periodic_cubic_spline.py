@@ -0,0 +1,50 @@
+import logging
+from functools import lru_cache
+
+import numpy as np
+from scipy.linalg import cho_solve_banded
+
+from .cubic_spline import CubicSpline
+
+logger = logging.getLogger('curve-editor')
+
+
+class PeriodicCubicSpline(CubicSpline):
+    type = "Periodic Cubic Spline"
+
+    @staticmethod
+    @lru_cache(maxsize=32)
+    def cyclic_correction(n):
+        # the cyclic matrix is tridiag(1, 4, 1) of size n plus two corner entries, i.e. a rank 2 update (Woodbury)
+        factor = CubicSpline.factorization(n + 2)
+
+        columns = np.zeros((n, 2))
+        columns[0, 0] = columns[-1, 1] = 1.0
+        correction = cho_solve_banded((factor, False), columns)
+
+        capacitance = np.eye(2) + correction[[-1, 0]]
+        correction = correction @ np.linalg.inv(capacitance)
+
+        correction.setflags(write=False)
+        return factor, correction
+
+    @staticmethod
+    def second_derivatives(values):
+        n = len(values)
+        h = 1 / n
+
+        rhs = 6 * (np.roll(values, -1, axis=0) - 2 * values + np.roll(values, 1, axis=0)) / h ** 2
+
+        factor, correction = PeriodicCubicSpline.cyclic_correction(n)
+        z = cho_solve_banded((factor, False), rhs)
+        return z - correction @ z[[-1, 0]]
+
+    @staticmethod
+    def interpolate(ts0, values):
+        """ Closed cubic spline through values at uniform knots on [0, 1), the last node joining the first """
+        values = np.asarray(values, dtype=float)
+        z = PeriodicCubicSpline.second_derivatives(values)
+
+        closed_values = np.concatenate((values, values[:1]))
+        closed_z = np.concatenate((z, z[:1]))
+        return CubicSpline.piecewise_cubic(ts0, closed_values, closed_z)
@@ -6,23 +6,40 @@ import numpy as np
 class PolygonalCurve(Curve):
     type = "Polygonal Curve"
 
+    def evaluate(self, ts):
+        nodes = self.node_array()
+        knots = np.linspace(0, 1, len(nodes))
+
+        xs = np.interp(ts, knots, nodes[:, 0])
+        ys = np.interp(ts, knots, nodes[:, 1])
+        return np.column_stack((xs, ys))
+
+    def node_basis(self, index):
+        if not isinstance(self.points, np.ndarray) or len(self.points) != len(self.params):
+            return None
+
+        unit = np.zeros(len(self.nodes))
+        unit[index] = 1.0
+        return np.interp(self.params, np.linspace(0, 1, len(unit)), unit)
+
+    def flatten(self, tolerance=None, max_depth=16):
+        # the nodes themselves are the exact polyline
+        return np.linspace(0, 1, len(self._nodes)), self.node_array()
+
     def calculate_points(self, force=True, fast=False):
         super().calculate_points()
 
         if len(self.nodes) < 2:
+            self.params = np.zeros(len(self.nodes))
             self.points = self.nodes
             return self.points
 
-        nodes = self.nodes
-        n = len(nodes)
-
-        ts = np.linspace(0, 1, n)
-        xs, ys = zip(*nodes)
+        if self.sampling != "uniform":
+            self.params, self.points = self.resample()
+            return self.points
 
-        ts_ = np.linspace(0, 1, self.resolution)
-        xs_ = np.interp(ts_, ts, xs)
-        ys_ = np.interp(ts_, ts, ys)
+        self.params = np.linspace(0, 1, self.resolution)
+        points = self.evaluate(self.params)
 
-        points = list(zip(xs_, ys_))
         self.points = points
         return self.points
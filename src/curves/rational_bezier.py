@@ -1,196 +1,51 @@
 import logging
 
 import numpy as np
-from PyQt5 import QtGui, QtCore, QtWidgets
-from scipy.special import comb
 
-from src.states import DefaultState, SetWeightNodeState
-from . import BezierCurve
+from .bezier import BezierCurve
+from .weighted_curve import WeightedCurve
 
 logger = logging.getLogger('curve-editor')
 
 
-class RationalBezierCurve(BezierCurve):
+class RationalBezierCurve(WeightedCurve, BezierCurve):
     type = "Rational Bezier Curve"
 
-    def __init__(self, name, nodes=None, weights=None):
-        super().__init__(name, nodes)
-
-        self.helper_weights = {}
-
-        self.weights = weights or []
-
-    def add_node(self, x, y, calculate=True):
-        self.nodes.append((x, y))
-        self.weights.append(1.0)
-        if calculate:
-            self.calculate_points(force=False)
-
-    def remove_node(self, index, calculate=True):
-        self.nodes.pop(index)
-        self.weights.pop(index)
-        if calculate:
-            self.calculate_points()
-
-    def change_nodes_order(self, index1, index2, mode, calculate=True):
-        node1, weight1 = self.nodes[index1], self.weights[index1]
-        node2, weight2 = self.nodes[index2], self.weights[index2]
-
-        if mode == 'swap':
-            self.nodes[index1] = node2
-            self.nodes[index2] = node1
-
-            self.weights[index1] = weight2
-            self.weights[index2] = weight1
-
-        elif mode == 'before':
-            self.nodes.insert(index2, node1)
-            self.weights.insert(index2, weight1)
-
-            if index2 <= index1:
-                self.nodes.pop(index1 + 1)
-                self.weights.pop(index1 + 1)
-            else:
-                self.nodes.pop(index1)
-                self.weights.pop(index1)
-
-        elif mode == 'after':
-            self.nodes.insert(index2 + 1, node1)
-            self.weights.insert(index2 + 1, weight1)
-
-            if index2 + 1 <= index1:
-                self.nodes.pop(index1 + 1)
-                self.weights.pop(index1 + 1)
-            else:
-                self.nodes.pop(index1)
-                self.weights.pop(index1)
-
-        if calculate:
-            self.calculate_points()
-
-    def set_node_weight(self, index, weight, calculate=True):
-        self.weights[index] = weight
-
-        if calculate:
-            self.calculate_points()
-
     def setup_toolbar(self, parent):
         super().setup_toolbar(parent)
 
-        self.set_weight_action = QtWidgets.QAction("Set weight", parent)
-        self.set_weight_action.triggered.connect(self.set_weight_action_triggered)
-        self.set_weight_action.setCheckable(True)
-        self.extra_toolbar.addAction(self.set_weight_action)
-
         self.join_right_action_g1.setDisabled(True)
 
-    def set_weight_action_triggered(self, state):
-        if state:
-            self.model.state = SetWeightNodeState(self)
-        else:
-            self.model.state = DefaultState()
-
-    def reverse_nodes(self, calculate=True):
-        super().reverse_nodes(calculate=False)
-        self.weights = self.weights[::-1]
-        if calculate:
-            self.calculate_points()
-
-    def split_curve(self, index):
-        n = len(self.nodes) - 1
-
-        first_nodes, first_weights = [], []
-        second_nodes, second_weights = [], []
-        for k in range(n + 1):
-            w1, W1 = self._rational_de_casteljau(k, 0, index)
-            w2, W2 = self._rational_de_casteljau(k, n - k, index)
-
-            first_nodes.append(tuple(W1))
-            first_weights.append(w1)
-
-            second_nodes.append(tuple(W2))
-            second_weights.append(w2)
-
-        first_curve = self.clone()
-        second_curve = self.clone()
-
-        first_curve.nodes = first_nodes
-        first_curve.weights = first_weights
-        first_curve.calculate_points(force=True)
-
-        second_curve.nodes = second_nodes
-        second_curve.weights = second_weights
-        second_curve.calculate_points(force=True)
-
-        return first_curve, second_curve
+    def subdivide(self, ts):
+        pieces = BezierCurve.subdivide_de_casteljau(self.homogeneous_nodes(), ts)
+        return [self.with_homogeneous_nodes(piece) for piece in pieces]
 
-    def draw_nodes(self, qp: QtGui.QPainter):
-        black_pen = QtGui.QPen(QtCore.Qt.black, 1, QtCore.Qt.DashLine)
-        red_pen = QtGui.QPen(self.node_color, 1, QtCore.Qt.DashLine)
-        red_brush = QtGui.QBrush(self.node_color)
+    def with_homogeneous_nodes(self, homogeneous):
+        nodes, weights = BezierCurve.from_homogeneous(homogeneous)
 
-        node_size = self.node_size
-        weights = self.weights
-        old_point = self.nodes[0]
-
-        qp.setPen(red_pen)
-        qp.setBrush(red_brush)
-        qp.drawEllipse(QtCore.QPointF(old_point[0] - 3, old_point[1] - 3), node_size, node_size)
-
-        qp.drawText(old_point[0] + 5, old_point[1] - 3, f'1 ({weights[0]: .2f})')
-        for i, point in enumerate(self.nodes[1:], 1):
-            qp.setPen(black_pen)
-            qp.drawLine(old_point[0], old_point[1], point[0], point[1])
-
-            qp.setPen(red_pen)
-            qp.drawEllipse(QtCore.QPointF(point[0] - 3, point[1] - 3), node_size, node_size)
-
-            qp.drawText(point[0] + 5, point[1] - 3, f'{i + 1} ({weights[i]: .2f})')
-            old_point = point
-
-    def _rational_de_casteljau(self, i, k, t):
-        if (i, k, t) not in self.helper_nodes:
-            if i == 0:
-                self.helper_weights[(i, k, t)] = self.weights[k]
-                self.helper_nodes[(i, k, t)] = np.array(self.nodes[k])
-            else:
-                w1, W1 = self._rational_de_casteljau(i - 1, k, t)
-                w2, W2 = self._rational_de_casteljau(i - 1, k + 1, t)
-
-                u = t / self.resolution
-                w = (1 - u) * w1 + u * w2
-                W = (1 - u) * w1 / w * W1 + u * w2 / w * W2
-
-                self.helper_weights[(i, k, t)] = w
-                self.helper_nodes[(i, k, t)] = W
+        curve = self.clone()
+        curve.nodes = list(map(tuple, nodes))
+        curve.weights = list(weights)
+        curve.calculate_points(force=True)
+        return curve
 
-        return self.helper_weights[(i, k, t)], self.helper_nodes[(i, k, t)]
+    def rational_de_casteljau(self, ts):
+        homogeneous = BezierCurve.evaluate_de_casteljau(self.homogeneous_nodes(), ts)
+        points, weights = BezierCurve.from_homogeneous(homogeneous)
+        return weights, points
 
-    def rational_de_casteljau(self, t):
-        w, W = self._rational_de_casteljau(len(self.nodes) - 1, 0, t)
-        return w, tuple(W)
+    def horner(self, ts):
+        homogeneous = BezierCurve.evaluate_horner(self.homogeneous_nodes(), ts)
+        points, _ = BezierCurve.from_homogeneous(homogeneous)
+        return points
 
-    def horner(self, t):
-        n = len(self.nodes) - 1
-        nodes = np.array(self.nodes)
-        weights = np.array(self.weights)
+    def node_basis(self, index):
+        # the weights make the samples a rational function of the nodes
+        return None
 
-        if t <= 0.5:
-            u = t / (1 - t)
-            numerator = weights[n] * nodes[n]
-            denominator = weights[n]
-            for i in range(n - 1, -1, -1):
-                numerator = numerator * u + weights[i] * nodes[i] * comb(n, i)
-                denominator = denominator * u + weights[i] * comb(n, i)
-            return tuple(numerator / denominator)
-
-        u = (1 - t) / t
-        numerator = weights[0] * nodes[0]
-        denominator = weights[0]
-        for i in range(n - 1, -1, -1):
-            numerator = numerator * u + weights[n - i] * nodes[n - i] * comb(n, n - i)
-            denominator = denominator * u + weights[n - i] * comb(n, n - i)
-        return tuple(numerator / denominator)
+    def evaluate(self, ts):
+        _, points = self.rational_de_casteljau(ts)
+        return points
 
     def join_right_smooth(self, other, c1=True):
         nodes1 = np.array(self.nodes)
@@ -243,73 +98,52 @@ class RationalBezierCurve(BezierCurve):
         new_weights = ws1[:-1] + [(ws1[-1] + ws2[-1]) / 2] + ws2[1:-1][::-1]
         self.weights = new_weights
 
-    def _raise_degree(self):
+    def _reduce_degree(self, m, continuity):
         n = len(self.nodes) - 1
-        nodes = np.array(self.nodes)
-        weights = np.array(self.weights)
-
-        new_nodes = [nodes[0]]
-        new_weights = [(n + 1) * weights[0]]
+        homogeneous = BezierCurve.reduction_matrix(n, m, continuity) @ self.homogeneous_nodes()
 
-        for i in range(1, n + 1):
-            weight = i * weights[i - 1] + (n + 1 - i) * weights[i]
-            new_weights.append(weight)
-
-            node = i * weights[i - 1] * nodes[i - 1] + (n + 1 - i) * weights[i] * nodes[i]
-            node /= weight
-            new_nodes.append(node)
-
-        new_nodes.append(nodes[-1])
-        new_weights.append((n + 1) * weights[-1])
-
-        self.nodes = [tuple(n) for n in new_nodes]
-        self.weights = new_weights
+        nodes, weights = BezierCurve.from_homogeneous(homogeneous)
+        self.nodes = list(map(tuple, nodes))
+        self.weights = list(weights)
 
     def raise_degree(self, m):
-        for _ in range(m):
-            self._raise_degree()
+        if self.nodes:
+            n = len(self.nodes) - 1
+            homogeneous = BezierCurve.elevation_matrix(n, m) @ self.homogeneous_nodes()
+
+            nodes, weights = BezierCurve.from_homogeneous(homogeneous)
+            self.nodes = list(map(tuple, nodes))
+            self.weights = list(weights)
         self.calculate_points()
 
     def calculate_points(self, force=True, fast=False):
         super(BezierCurve, self).calculate_points()
 
-        if not self.nodes:
+        if not len(self._nodes):
             self.points = []
             return self.points
 
-        nodes, weights = np.array(self.nodes), np.array(self.weights)
+        if self.sampling != "uniform":
+            self.params, self.points = self.resample()
+            return self.points
 
         if fast:
             steps = max(20, self.resolution // 10)
+            self.params = np.linspace(0, 1, steps)
 
             # Horner algorithm
-            points = [self.horner(t) for t in np.linspace(0, 1, steps)]
+            points = self.horner(self.params)
             self.points = points
             return self.points
 
-        if force:
-            self.helper_nodes = {}
-            self.helper_weights = {}
-
-        steps = self.resolution
+        n = len(self._nodes) - 1
+        self.params = np.linspace(0, 1, self.resolution + 1)
 
-        # Rational De Casteljau Algorithm
-        points = [self.rational_de_casteljau(i)[1] for i in range(steps + 1)]
+        if BezierCurve.caches_basis(n, self.resolution):
+            points, _ = BezierCurve.from_homogeneous(BezierCurve.bernstein_basis(n, self.resolution) @
+                                                     self.homogeneous_nodes())
+        else:
+            points = self.horner(self.params)
 
         self.points = points
         return self.points
-
-    def to_dict(self):
-        data = super().to_dict()
-
-        data["weights"] = self.weights
-        return data
-
-    @classmethod
-    def from_dict(cls, data, calculate=True):
-        curve = super().from_dict(data, calculate=False)
-        curve.weights = data["weights"]
-
-        if calculate:
-            curve.calculate_points()
-        return curve
@@ -0,0 +1,157 @@
+import logging
+
+import numpy as np
+from PyQt5 import QtGui, QtCore, QtWidgets
+
+from src.states import DefaultState, SetWeightNodeState
+from .curves import Curve, POLYGON_PEN
+
+logger = logging.getLogger('curve-editor')
+
+
+class WeightedCurve(Curve):
+    """ Curve whose nodes carry weights, kept in step with the nodes on every edit """
+    type = "Weighted Curve"
+
+    copy_on_write = Curve.copy_on_write + ("_weights",)
+
+    def __init__(self, name, nodes=None, weights=None):
+        self.sampled_weights = None
+        super().__init__(name, nodes)
+
+        self.weights = weights or []
+
+    @property
+    def weights(self):
+        if self.shared:
+            self.own("_weights")
+        return self._weights
+
+    @weights.setter
+    def weights(self, weights):
+        self.shared = self.shared - {"_weights"}
+        self._weights = weights
+
+    def stamp_samples(self):
+        super().stamp_samples()
+        self.sampled_weights = list(self._weights)
+
+    def samples_current(self):
+        return super().samples_current() and self.sampled_weights == self._weights
+
+    def add_node(self, x, y, calculate=True):
+        self.nodes.append((x, y))
+        self.weights.append(1.0)
+        if calculate:
+            self.calculate_points(force=False)
+
+    def remove_node(self, index, calculate=True):
+        self.nodes.pop(index)
+        self.weights.pop(index)
+        if calculate:
+            self.calculate_points()
+
+    def change_nodes_order(self, index1, index2, mode, calculate=True):
+        node1, weight1 = self.nodes[index1], self.weights[index1]
+        node2, weight2 = self.nodes[index2], self.weights[index2]
+
+        if mode == 'swap':
+            self.nodes[index1] = node2
+            self.nodes[index2] = node1
+
+            self.weights[index1] = weight2
+            self.weights[index2] = weight1
+
+        elif mode == 'before':
+            self.nodes.insert(index2, node1)
+            self.weights.insert(index2, weight1)
+
+            if index2 <= index1:
+                self.nodes.pop(index1 + 1)
+                self.weights.pop(index1 + 1)
+            else:
+                self.nodes.pop(index1)
+                self.weights.pop(index1)
+
+        elif mode == 'after':
+            self.nodes.insert(index2 + 1, node1)
+            self.weights.insert(index2 + 1, weight1)
+
+            if index2 + 1 <= index1:
+                self.nodes.pop(index1 + 1)
+                self.weights.pop(index1 + 1)
+            else:
+                self.nodes.pop(index1)
+                self.weights.pop(index1)
+
+        if calculate:
+            self.calculate_points()
+
+    def set_node_weight(self, index, weight, calculate=True):
+        self.weights[index] = weight
+
+        if calculate:
+            self.calculate_points()
+
+    def setup_toolbar(self, parent):
+        super().setup_toolbar(parent)
+
+        if self.extra_toolbar is None:
+            self.extra_toolbar = QtWidgets.QToolBar()
+
+        self.set_weight_action = QtWidgets.QAction("Set weight", parent)
+        self.set_weight_action.triggered.connect(self.set_weight_action_triggered)
+        self.set_weight_action.setCheckable(True)
+        self.extra_toolbar.addAction(self.set_weight_action)
+
+    def set_weight_action_triggered(self, state):
+        if state:
+            self.model.state = SetWeightNodeState(self)
+        else:
+            self.model.state = DefaultState()
+
+    def reverse_nodes(self, calculate=True):
+        super().reverse_nodes(calculate=False)
+        self.weights = self.weights[::-1]
+        if calculate:
+            self.calculate_points()
+
+    def homogeneous_nodes(self):
+        nodes = self.node_array()
+        weights = np.array(self.weights, dtype=float)
+        return np.column_stack((nodes * weights[:, np.newaxis], weights))
+
+    def layer_key(self):
+        # weights are printed next to the nodes
+        return super().layer_key() + (tuple(self.weights) if self.show_nodes else (),)
+
+    def draw_nodes(self, qp: QtGui.QPainter):
+        pens = self.pens()
+        node_size = self.node_size
+        weights = self.weights
+
+        # control polygon in one call, nodes on top of it
+        nodes = self.node_array()
+        qp.setPen(POLYGON_PEN)
+        qp.drawPolyline(self.polyline(nodes))
+
+        qp.setPen(pens["node"])
+        qp.setBrush(pens["node_brush"])
+        for i, (x, y) in enumerate(nodes, 1):
+            qp.drawEllipse(QtCore.QPointF(x - 3, y - 3), node_size, node_size)
+            qp.drawText(QtCore.QPointF(x + 5, y - 3), f'{i} ({weights[i - 1]: .2f})')
+
+    def to_dict(self):
+        data = super().to_dict()
+
+        data["weights"] = self.weights
+        return data
+
+    @classmethod
+    def from_dict(cls, data, calculate=True):
+        curve = super().from_dict(data, calculate=False)
+        curve.weights = data["weights"]
+
+        if calculate:
+            curve.calculate_points()
+        return curve
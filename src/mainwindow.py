@@ -3,10 +3,11 @@ import logging
 logger = logging.getLogger('curve-editor')
 
 from PyQt5 import QtWidgets
-from PyQt5.QtCore import Qt
+from PyQt5.QtCore import Qt, QEvent
 
 from .canvas import Canvas
-from .curves import BezierCurve, PolygonalCurve, InterpolationPolynomialCurve, RationalBezierCurve, CubicSpline
+from .curves import BezierCurve, PolygonalCurve, InterpolationPolynomialCurve, RationalBezierCurve, CubicSpline, \
+    PeriodicCubicSpline, NURBSCurve
 from .model import CurvesModel
 
 from .states import SelectCurveState, RemoveCurveState, MoveCurveState, DuplicateCurveState, DefaultState
@@ -41,11 +42,21 @@ class MainWindow(QtWidgets.QMainWindow, Ui_MainWindow):
         scene.addItem(self.canvas)
         self.graphicsView.setScene(scene)
 
+        # the canvas is the viewport itself, zoomed and panned with the wheel and the middle button
+        self.graphicsView.setHorizontalScrollBarPolicy(Qt.ScrollBarAlwaysOff)
+        self.graphicsView.setVerticalScrollBarPolicy(Qt.ScrollBarAlwaysOff)
+        self.graphicsView.viewport().installEventFilter(self)
+
         self.model.updated()
         self.add_toolbar()
 
         self.dockWidget.hide()
 
+    def eventFilter(self, obj, event):
+        if obj is self.graphicsView.viewport() and event.type() == QEvent.Resize:
+            self.model.updated()
+        return super().eventFilter(obj, event)
+
     def model_changed(self):
         logger.info('Update window')
 
@@ -107,6 +118,20 @@ class MainWindow(QtWidgets.QMainWindow, Ui_MainWindow):
         curve.add_node_action.trigger()
         curve.show_nodes_action.trigger()
 
+    def new_periodic_cubic_spline_action_triggered(self):
+        curve = PeriodicCubicSpline("")
+        self.model.add(curve, selected=True)
+
+        curve.add_node_action.trigger()
+        curve.show_nodes_action.trigger()
+
+    def new_nurbs_action_triggered(self):
+        curve = NURBSCurve("")
+        self.model.add(curve, selected=True)
+
+        curve.add_node_action.trigger()
+        curve.show_nodes_action.trigger()
+
     def select_curve_action_triggered(self, state):
         if state:
             logger.info("select curve mode")
@@ -140,6 +165,14 @@ class MainWindow(QtWidgets.QMainWindow, Ui_MainWindow):
         new_cubic_spline_action.triggered.connect(self.new_cubic_spline_action_triggered)
         new_curve_menu.addAction(new_cubic_spline_action)
 
+        new_periodic_cubic_spline_action = QtWidgets.QAction("Periodic Cubic Spline", self)
+        new_periodic_cubic_spline_action.triggered.connect(self.new_periodic_cubic_spline_action_triggered)
+        new_curve_menu.addAction(new_periodic_cubic_spline_action)
+
+        new_nurbs_action = QtWidgets.QAction("NURBS", self)
+        new_nurbs_action.triggered.connect(self.new_nurbs_action_triggered)
+        new_curve_menu.addAction(new_nurbs_action)
+
         new_curve_button.setMenu(new_curve_menu)
         self.toolBar.addWidget(new_curve_button)
 
@@ -163,6 +196,11 @@ class MainWindow(QtWidgets.QMainWindow, Ui_MainWindow):
         self.duplicate_curve_action.setCheckable(True)
         self.toolBar.addAction(self.duplicate_curve_action)
 
+        self.snap_to_nodes_action = QtWidgets.QAction("Snap to nodes", self)
+        self.snap_to_nodes_action.triggered.connect(self.snap_to_nodes_action_triggered)
+        self.snap_to_nodes_action.setCheckable(True)
+        self.toolBar.addAction(self.snap_to_nodes_action)
+
         # self.addToolBarBreak()
 
     def curve_selected(self, index):
@@ -191,6 +229,10 @@ class MainWindow(QtWidgets.QMainWindow, Ui_MainWindow):
         else:
             self.model.state = DefaultState()
 
+    def snap_to_nodes_action_triggered(self, state):
+        logger.info(f"Snap to nodes: {state}")
+        self.model.snapping = state
+
     def toggle_curves_list(self):
         if self.dockWidget.isHidden():
             self.dockWidget.show()
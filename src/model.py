@@ -1,13 +1,18 @@
 import json
 
-from PyQt5.QtCore import QAbstractListModel, Qt
+import numpy as np
+
+from PyQt5.QtCore import QAbstractListModel, Qt, QTimer
 
 import src.curves
 from .curves import Curve
+from .curves.node_index import SceneNodeGrid
 from .states import DefaultState
 
 
 class CurvesModel(QAbstractListModel):
+    frame_interval = 16  # ms
+
     def __init__(self, *args, curves=None, parent=None, **kwargs):
         super().__init__(*args, **kwargs)
         self.curves = curves or []
@@ -18,6 +23,17 @@ class CurvesModel(QAbstractListModel):
         self.selected_curve = None
         self.selected_curve_index = None
 
+        self.snapping = False
+        self.snap_tolerance = 10.0
+        self.node_grid = SceneNodeGrid()
+
+        # updated() only marks the scene dirty; one frame per tick applies deferred edits and repaints
+        self.deferred = {}
+        self.frame_timer = QTimer(self)
+        self.frame_timer.setSingleShot(True)
+        self.frame_timer.setInterval(self.frame_interval)
+        self.frame_timer.timeout.connect(self.frame)
+
     @property
     def state(self):
         return self.__state
@@ -37,22 +53,75 @@ class CurvesModel(QAbstractListModel):
             self.select(len(self.curves) - 1)
 
     def data(self, index, role=None):
-        if role == Qt.DisplayRole:
+        if role == Qt.DisplayRole and index.row() < len(self.curves):
             curve = self.curves[index.row()]
             return str(curve)
 
     def rowCount(self, parent=None):
         return len(self.curves)
 
-    def distance_to_nearest_curve(self, x, y):
-        dists = [(curve.distance_to_nearest_point(x, y)[1], i)
-                 for i, curve in enumerate(self.curves)]
-
-        if dists:
-            dist, index = min(dists)
-            return index, dist
-
-        return None, None
+    def distance_to_nearest_curve(self, x, y, max_dist=None):
+        boxes = [(i, curve.bounding_box()) for i, curve in enumerate(self.curves)]
+        boxes = [(i, box) for i, box in boxes if box is not None]
+        if not boxes:
+            return None, None
+
+        # curves are tested nearest bounding box first, the rest is pruned by the best distance so far
+        indices = np.array([i for i, _ in boxes])
+        lows = np.array([low for _, (low, _) in boxes])
+        highs = np.array([high for _, (_, high) in boxes])
+        box_dists = Curve.box_distance(lows, highs, x, y)
+
+        best_index, best_dist = None, max_dist
+        for k in np.argsort(box_dists, kind='stable'):
+            if best_dist is not None and box_dists[k] > best_dist:
+                break
+
+            _, dist = self.curves[indices[k]].distance_to_nearest_point(x, y, max_dist=best_dist)
+            if dist is not None and (best_index is None or dist < best_dist):
+                best_index, best_dist = int(indices[k]), dist
+
+        if best_index is None:
+            return None, None
+        return best_index, best_dist
+
+    def intersections(self, tolerance=0.5):
+        """ Crossings between every pair of curves as (i, j, t_i, t_j, (x, y)), pairs pruned by a box sweep """
+        boxes = [(i, curve.bounding_box()) for i, curve in enumerate(self.curves)]
+        boxes = [(i, box) for i, box in boxes if box is not None]
+        if len(boxes) < 2:
+            return []
+
+        indices = np.array([i for i, _ in boxes])
+        lows = np.array([low for _, (low, _) in boxes])
+        highs = np.array([high for _, (_, high) in boxes])
+
+        # sweep along x: only boxes starting before this one ends can overlap it
+        order = np.argsort(lows[:, 0], kind='stable')
+        indices, lows, highs = indices[order], lows[order], highs[order]
+        ends = np.searchsorted(lows[:, 0], highs[:, 0], side='right')
+
+        intersections = []
+        for a in range(len(indices)):
+            candidates = np.arange(a + 1, ends[a])
+            candidates = candidates[(lows[candidates, 1] <= highs[a, 1]) & (lows[a, 1] <= highs[candidates, 1])]
+
+            for b in candidates:
+                i, j = sorted((int(indices[a]), int(indices[b])))
+                for t_i, t_j, point in self.curves[i].intersect(self.curves[j], tolerance):
+                    intersections.append((i, j, t_i, t_j, point))
+
+        return intersections
+
+    def nearest_node(self, x, y, max_dist, exclude=None):
+        """ Nearest node of any curve within max_dist, exclude is a (curve, node index) pair to skip """
+        grid = self.node_grid.fit(max_dist)
+        grid.sync(self.curves)
+
+        curve, index, dist = grid.nearest_node(x, y, max_dist, exclude)
+        if curve is None:
+            return None, None, None
+        return self.curves.index(curve), index, dist
 
     def select(self, index):
         if self.selected_curve:
@@ -92,9 +161,26 @@ class CurvesModel(QAbstractListModel):
             self.updated()
 
     def updated(self):
+        if not self.frame_timer.isActive():
+            self.frame_timer.start()
+
+    def defer(self, key, update):
+        """ Run update at the next frame; a later update with the same key replaces it """
+        self.deferred[key] = update
+        self.updated()
+
+    def apply_deferred(self):
+        deferred, self.deferred = self.deferred, {}
+        for update in deferred.values():
+            update()
+
+    def frame(self):
+        self.apply_deferred()
         self.layoutChanged.emit()
 
     def save(self, filename):
+        self.apply_deferred()
+
         curves = [curve.to_dict() for curve in self.curves]
         with open(filename, 'w') as outfile:
             json.dump(curves, outfile)
@@ -120,6 +206,8 @@ class CurvesModel(QAbstractListModel):
 
         del self.curves
         self.curves = []
+        self.deferred = {}
+        self.node_grid = SceneNodeGrid(self.node_grid.cell_size)
 
         if update:
             self.updated()
@@ -44,13 +44,13 @@ class SelectCurveState(DefaultState):
         self.controller.setChecked(False)
 
     def mousePressEvent(self, event, canvas):
-        x, y = event.pos().x(), event.pos().y()
+        x, y = canvas.scene_position(event)
 
         logger.info('selecting')
 
-        index, dist = canvas.model.distance_to_nearest_curve(x, y)
+        index, dist = canvas.model.distance_to_nearest_curve(x, y, max_dist=canvas.scene_distance(10))
         logger.info(index, dist)
-        if dist is not None and dist < 10:
+        if dist is not None and dist < canvas.scene_distance(10):
             canvas.model.select(index)
             logger.info(f'Selected curve: {index}')
         else:
@@ -74,13 +74,13 @@ class RemoveCurveState(DefaultState):
         self.controller.setChecked(False)
 
     def mousePressEvent(self, event, canvas):
-        x, y = event.pos().x(), event.pos().y()
+        x, y = canvas.scene_position(event)
 
         logger.info('removing')
 
-        index, dist = canvas.model.distance_to_nearest_curve(x, y)
+        index, dist = canvas.model.distance_to_nearest_curve(x, y, max_dist=canvas.scene_distance(10))
         logger.info(index, dist)
-        if dist is not None and dist < 10:
+        if dist is not None and dist < canvas.scene_distance(10):
             canvas.model.remove_curve(index)
             logger.info(f'Remove curve: {index}')
 
@@ -93,6 +93,7 @@ class MoveCurveState(DefaultState):
 
         self.curve = None
         self.last_position = None
+        self.applied_position = None
 
         self.parent = parent
         self.controller = parent.move_curve_action
@@ -105,31 +106,29 @@ class MoveCurveState(DefaultState):
         self.controller.setChecked(False)
 
     def mousePressEvent(self, event, canvas):
-        x, y = event.pos().x(), event.pos().y()
+        x, y = canvas.scene_position(event)
 
-        index, dist = canvas.model.distance_to_nearest_curve(x, y)
-        if dist is not None and dist < 10:
+        index, dist = canvas.model.distance_to_nearest_curve(x, y, max_dist=canvas.scene_distance(10))
+        if dist is not None and dist < canvas.scene_distance(10):
             self.curve = canvas.model.curves[index]
-            self.last_position = (x, y)
+            self.last_position = self.applied_position = (x, y)
         else:
             canvas.model.state = self.next_state()
 
     def mouseMoveEvent(self, event, canvas):
-        x, y = event.pos().x(), event.pos().y()
+        x, y = canvas.scene_position(event)
 
         if self.curve is not None:
-            curve = self.curve
-            last_x, last_y = self.last_position
-
-            dx, dy = x - last_x, y - last_y
-            curve.translate(dx, dy, calculate=False)
-            curve.calculate_points(fast=True)
-            canvas.model.updated()
-
+            # the offsets of one frame are applied together at its tick
             self.last_position = (x, y)
+            canvas.model.defer((self.curve, "translate"), self.apply_translation)
+
+    def apply_translation(self):
+        (x, y), (applied_x, applied_y) = self.last_position, self.applied_position
+        self.curve.translate(x - applied_x, y - applied_y)
+        self.applied_position = (x, y)
 
     def mouseReleaseEvent(self, event, canvas):
-        self.curve.calculate_points(force=True)
         canvas.model.updated()
         canvas.model.state = self.next_state()
 
@@ -144,10 +143,11 @@ class AddNodeState(DefaultState):
         self.curve.add_node_action.setChecked(False)
 
     def mousePressEvent(self, event, canvas):
-        x, y = event.pos().x(), event.pos().y()
+        x, y = canvas.scene_position(event)
 
-        self.curve.add_node(x, y)
-        canvas.model.layoutChanged.emit()
+        # the node is added now, the samples are recalculated once at the next frame
+        self.curve.add_node(x, y, calculate=False)
+        canvas.model.defer((self.curve, "calculate"), self.curve.calculate_points)
 
 
 class RemoveNodeState(DefaultState):
@@ -164,15 +164,15 @@ class RemoveNodeState(DefaultState):
         self.curve.remove_node_action.setChecked(False)
 
     def mousePressEvent(self, event, canvas):
-        x, y = event.pos().x(), event.pos().y()
+        x, y = canvas.scene_position(event)
 
         curve = self.curve
 
-        index, dist = curve.nearest_node(x, y)
+        index, dist = curve.nearest_node(x, y, max_dist=canvas.scene_distance(10))
 
-        if dist is not None and dist < 10:
-            curve.remove_node(index)
-            canvas.model.layoutChanged.emit()
+        if dist is not None and dist < canvas.scene_distance(10):
+            curve.remove_node(index, calculate=False)
+            canvas.model.defer((curve, "calculate"), curve.calculate_points)
 
         canvas.model.state = self.next_state()
 
@@ -183,6 +183,7 @@ class MoveNodeState(DefaultState):
 
         self.curve = curve
         self.selected_point = None
+        self.dragged = False
 
     def enable(self):
         if not self.curve.show_nodes_action.isChecked():
@@ -192,33 +193,39 @@ class MoveNodeState(DefaultState):
         self.curve.move_node_action.setChecked(False)
 
     def mousePressEvent(self, event, canvas):
-        x, y = event.pos().x(), event.pos().y()
+        x, y = canvas.scene_position(event)
 
         curve = self.curve
 
-        index, dist = curve.nearest_node(x, y)
+        index, dist = curve.nearest_node(x, y, max_dist=canvas.scene_distance(10))
 
-        if dist is not None and dist < 10:
+        if dist is not None and dist < canvas.scene_distance(10):
             self.selected_point = index
 
     def mouseMoveEvent(self, event, canvas):
-        x, y = event.pos().x(), event.pos().y()
+        x, y = canvas.scene_position(event)
 
         if self.selected_point is not None:
             curve = self.curve
             index = self.selected_point
 
-            curve.move_node(index, x, y, calculate=False)
-            curve.calculate_points(fast=True)
-            canvas.model.updated()
+            model = canvas.model
+            if model.snapping:
+                other, node, _ = model.nearest_node(x, y, canvas.scene_distance(model.snap_tolerance),
+                                                   exclude=(curve, index))
+                if other is not None:
+                    x, y = model.curves[other].nodes[node]
 
-    def mouseReleaseEvent(self, event, canvas):
-        if self.selected_point is not None:
-            curve = self.curve
-            curve.calculate_points(force=True)
-            canvas.model.updated()
+            # only the last position of each frame is applied, the samples are recalculated at the tick,
+            # coarsely while dragging when they cannot be updated in place
+            model.defer((curve, index), lambda: curve.move_node(index, x, y, fast=True))
+            self.dragged = True
 
+    def mouseReleaseEvent(self, event, canvas):
+        if self.dragged:
+            canvas.model.defer((self.curve, "calculate"), self.curve.calculate_points)
         self.selected_point = None
+        self.dragged = False
 
 
 class ChangeNodesOrderState(DefaultState):
@@ -237,12 +244,12 @@ class ChangeNodesOrderState(DefaultState):
             self.curve.show_nodes_action.trigger()
 
     def mousePressEvent(self, event, canvas):
-        x, y = event.pos().x(), event.pos().y()
+        x, y = canvas.scene_position(event)
 
         curve = self.curve
-        index, dist = curve.nearest_node(x, y)
+        index, dist = curve.nearest_node(x, y, max_dist=canvas.scene_distance(10))
 
-        if dist is not None and dist < 10:
+        if dist is not None and dist < canvas.scene_distance(10):
             if self.first_node is None:
                 self.first_node = index
             else:
@@ -275,11 +282,11 @@ class DuplicateCurveState(DefaultState):
         self.controller.setChecked(False)
 
     def mousePressEvent(self, event, canvas):
-        x, y = event.pos().x(), event.pos().y()
+        x, y = canvas.scene_position(event)
 
-        index, dist = canvas.model.distance_to_nearest_curve(x, y)
+        index, dist = canvas.model.distance_to_nearest_curve(x, y, max_dist=canvas.scene_distance(10))
         logger.info(index, dist)
-        if dist is not None and dist < 10:
+        if dist is not None and dist < canvas.scene_distance(10):
             curve = canvas.model.curves[index]
 
             new_curve = curve.clone()
@@ -297,12 +304,12 @@ class SplitCurveState(DefaultState):
         self.curve = curve
 
     def mousePressEvent(self, event, canvas):
-        x, y = event.pos().x(), event.pos().y()
+        x, y = canvas.scene_position(event)
 
         curve = self.curve
-        index, dist = curve.distance_to_nearest_point(x, y)
+        index, dist = curve.distance_to_nearest_point(x, y, max_dist=canvas.scene_distance(10))
 
-        if dist is not None and dist < 10:
+        if dist is not None and dist < canvas.scene_distance(10):
             logger.info("Splitting curve")
             first_curve, second_curve = curve.split_curve(index)
 
@@ -333,11 +340,11 @@ class SetWeightNodeState(DefaultState):
         self.curve.set_weight_action.setChecked(False)
 
     def mousePressEvent(self, event, canvas):
-        x, y = event.pos().x(), event.pos().y()
+        x, y = canvas.scene_position(event)
         curve = self.curve
-        index, dist = curve.nearest_node(x, y)
+        index, dist = curve.nearest_node(x, y, max_dist=canvas.scene_distance(10))
 
-        if dist is not None and dist < 10:
+        if dist is not None and dist < canvas.scene_distance(10):
             logger.info('Changing node weight')
             weight, ok = QInputDialog().getDouble(canvas.model.parent,
                                                   "Set node weight",